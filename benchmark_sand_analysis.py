@@ -0,0 +1,137 @@
+"""
+Benchmarks for sand_analysis.py on synthetic sieve data.
+
+Example:  python benchmark_sand_analysis.py --samples 100 1000 10000 --output benchmark_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')       #render off-screen
+import matplotlib.pyplot as plt
+import sand_analysis
+
+#the 48 sieve ladder used by sievefile.txt, in microns
+benchmark_sieve_sizes = [8000, 4000, 3360, 2830, 2380, 2000, 1680, 1410, 1190, 1000, 850, 710, 600, 500, 420, 350, 297, 250,
+                         210, 177, 149, 125, 105, 88, 74, 62, 53, 44, 37, 31, 26, 22, 19, 16, 13, 11, 9.3, 7.8, 6.2, 5.5,
+                         4.6, 3.9, 3.3, 2.8, 2.3, 1.9, 1.6, 1.4]
+benchmark_stages = ['read_sieve_data_file', 'calculate_sieve_results', 'export_sieve_results_file', 'read_saved_file_json', 'show_plots', 'save_plots']
+
+
+def erf(x):
+    #Abramowitz and Stegun 7.1.26, absolute error below 1.5e-7 which is plenty for synthetic weights
+    _sign = np.sign(x)
+    x = np.abs(x)
+    _t = 1 / (1 + 0.3275911 * x)
+    _poly = _t * (0.254829592 + _t * (-0.284496736 + _t * (1.421413741 + _t * (-1.453152027 + _t * 1.061405429))))
+    return _sign * (1 - _poly * np.exp(-x * x))
+
+def synthetic_retained_weights(samples, rng, sieve_sizes=benchmark_sieve_sizes):
+    #log-normal grain sizes per sample, d50 from silt to coarse sand and a geometric spread from well to poorly sorted
+    _d50 = np.exp(rng.uniform(np.log(40), np.log(800), samples))
+    _sigma = rng.uniform(np.log(1.3), np.log(3.5), samples)
+    _sizes = np.asarray(sieve_sizes, dtype=np.float64)
+    #fraction finer than each sieve, the pan catches whatever passes the last sieve
+    _finer = 0.5 * (1 + erf((np.log(_sizes)[None, :] - np.log(_d50)[:, None]) / (_sigma[:, None] * np.sqrt(2))))
+    retained = -np.diff(np.concatenate([np.ones((samples, 1)), _finer], axis=1), axis=1)
+    retained[:, -1] += _finer[:, -1]
+    #weighing error on each sieve
+    retained *= rng.lognormal(0, 0.05, retained.shape)
+    return np.maximum(retained, 0) * 100 / retained.sum(axis=1, keepdims=True)
+
+def write_synthetic_sieve_file(data_filename, samples, seed=0, chunk_size=100000, sieve_sizes=benchmark_sieve_sizes):
+    #same layout as sievefile.txt, written in chunks so very large files do not have to fit in memory
+    rng = np.random.default_rng(seed)
+    with open(data_filename, 'w') as file:
+        file.write("Sample,Depth," + ",".join(f"{_size:g}" for _size in sieve_sizes) + "\n")
+        for _start in range(0, samples, chunk_size):
+            _count = min(chunk_size, samples - _start)
+            _depth = 10000 + 0.25 * np.arange(_start, _start + _count)
+            _retained = synthetic_retained_weights(_count, rng, sieve_sizes)
+            np.savetxt(file, np.column_stack([np.arange(_start, _start + _count), _depth, _retained]), delimiter=',',
+                       fmt=['SYN%08d', '%.2f'] + ['%.5f'] * len(sieve_sizes))
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(samples, stages, repeat, work_directory, seed=0):
+    sieve_filename = os.path.join(work_directory, f"synthetic_{samples}.txt")
+    saved_filename = os.path.join(work_directory, f"synthetic_{samples}.json")
+    plot_filename = os.path.join(work_directory, f"synthetic_{samples}.png")
+    write_synthetic_sieve_file(sieve_filename, samples, seed)
+    proppant_dictionary = sand_analysis.read_proppant_data_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_proppantdatabase.txt'))
+    screen_dictionary = sand_analysis.read_screen_data_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_screendatabase.txt'))
+    selected_screens, selected_proppants = ['6 Gauge WWS'], ['Gravel 20/40']
+    results = []
+    for _stage in benchmark_stages:
+        if _stage not in stages:
+            continue
+        _times = []
+        for _repeat in range(repeat):
+            #every stage starts from the output of the stages before it, the read stage from nothing so only its own samples are in memory
+            data = None
+            if _stage != 'read_sieve_data_file':
+                data = sand_analysis.read_sieve_data_file(sieve_filename)
+            if _stage in ('export_sieve_results_file', 'read_saved_file_json', 'show_plots', 'save_plots'):
+                data = sand_analysis.calculate_sieve_results('micron', data, proppant_dictionary, selected_proppants[0])
+            if _stage == 'read_saved_file_json':
+                sand_analysis.export_sieve_results_file('micron', data, selected_screens, selected_proppants, saved_filename)
+                data = None
+            _start = time.perf_counter()
+            if _stage == 'read_sieve_data_file':
+                sand_analysis.read_sieve_data_file(sieve_filename)
+            elif _stage == 'calculate_sieve_results':
+                sand_analysis.calculate_sieve_results('micron', data, proppant_dictionary, selected_proppants[0])
+            elif _stage == 'export_sieve_results_file':
+                sand_analysis.export_sieve_results_file('micron', data, selected_screens, selected_proppants, saved_filename)
+            elif _stage == 'read_saved_file_json':
+                sand_analysis.read_saved_file_json(saved_filename)
+            elif _stage == 'show_plots':
+                sand_analysis.show_plots(data, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants)
+                plt.gcf().canvas.draw()
+                plt.close('all')
+            elif _stage == 'save_plots':
+                sand_analysis.save_plots(data, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, plot_filename)
+            _times.append(time.perf_counter() - _start)
+        results.append({'stage': _stage, 'samples': samples, 'repeat': repeat, 'seconds': _times,
+                        'best_seconds': min(_times), 'samples_per_second': samples / min(_times) if min(_times) > 0 else None})
+        print(f"{samples:>10}\t{_stage:<28}\t{min(_times):.4f} s")
+    for _filename in (sieve_filename, saved_filename, plot_filename):
+        if os.path.isfile(_filename):
+            os.remove(_filename)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of sand_analysis.py on synthetic sieve data.")
+    parser.add_argument('--samples', type=int, nargs='+', default=[100, 1000, 10000], help="sample counts to benchmark")
+    parser.add_argument('--stages', nargs='+', default=benchmark_stages, choices=benchmark_stages, help="stages to time")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage, the best time is reported")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the synthetic data")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file for the results")
+    parser.add_argument('--work-directory', default=None, help="where synthetic files are written, a temporary directory by default")
+    args = parser.parse_args(argv)
+
+    report = {'commit': git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+              'numpy': np.__version__, 'matplotlib': matplotlib.__version__, 'platform': platform.platform(), 'results': []}
+    with tempfile.TemporaryDirectory(dir=args.work_directory) as work_directory:
+        for _samples in args.samples:
+            report['results'].extend(run_benchmark(_samples, args.stages, args.repeat, work_directory, args.seed))
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -8,15 +8,147 @@
 
 
 import math
+import os
+import re
+import sys
+import glob
 import json
+import sqlite3
+import hashlib
+import itertools
+import collections
+import argparse
+import atexit
+import cProfile
+import functools
+import inspect
+import time
+import tracemalloc
+import concurrent.futures
 import numpy as np
-import matplotlib.pyplot as plt
 
 #units in microns. made as a dictionary for lookup
 wentworth_sand_classification = {'Clay': 3.9, 'Silt': 62.0, 'VFG Sand': 125.0, 'FG Sand': 250.0, 
                                'MG Sand': 500.0, 'CG Sand': 1000.0, 'VCG Sand': 2000.0, 'Gravel': 4000.0}
 uniformity_classification = {3: 'Highly Uniform', 5: 'Uniform', 10: 'Non-Uniform', 25: 'Highly Non-Uniform'}
 mobile_fines_classification = {5: 'Fines Immobile', 10: 'Impairment Increasing', 25: 'Impairment Decreasing', 250: 'Fines Produced'}
+#databases shipped next to this script, loaded by default
+default_screen_database_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_screendatabase.txt')
+default_proppant_database_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_proppantdatabase.txt')
+#sample names are only listed in the retained weight legend for small data sets
+plot_legend_limit = 30
+#binary results file layout, see export_sieve_results_binary
+binary_file_signature = b'SRTBIN01'
+binary_column_alignment = 64
+#cumulative weight percentages interpolated for the grain size parameters
+sieve_percentages = [5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 95]
+#weighing error models for calculate_sieve_uncertainty
+uncertainty_noise_models = ('lognormal', 'normal')
+
+
+class StageProfiler():
+    #per stage wall time, sample count, bytes read/written and peak traced memory, off unless enabled
+    def __init__(self):
+        self.enabled = False
+        self.records = []
+        self.cprofile = None
+        self._peak_stack = []        #peaks of the stages currently running, so nested stages do not hide the outer peak
+
+    def enable(self, cprofile=False):
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if cprofile and self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def disable(self):
+        self.enabled = False
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def clear(self):
+        self.records = []
+
+    def summary(self):
+        #totals per stage name
+        _summary = {}
+        for _record in self.records:
+            _stage = _summary.setdefault(_record['stage'], {'calls': 0, 'seconds': 0.0, 'samples': 0, 'bytes_read': 0, 'bytes_written': 0, 'peak_memory_bytes': 0})
+            _stage['calls'] += 1
+            _stage['seconds'] += _record['seconds']
+            _stage['samples'] += _record['samples'] or 0
+            _stage['bytes_read'] += _record['bytes_read']
+            _stage['bytes_written'] += _record['bytes_written']
+            _stage['peak_memory_bytes'] = max(_stage['peak_memory_bytes'], _record['peak_memory_bytes'])
+        return _summary
+
+    def export_json(self, data_filename):
+        with open(data_filename, 'w',) as file:
+            json.dump({'Stages': self.records, 'Summary': self.summary()}, file, indent=2)
+
+    def export_cprofile(self, data_filename):
+        #pstats/snakeviz readable dump, needs enable(cprofile=True)
+        if self.cprofile is None:
+            raise ValueError("cProfile was not enabled")
+        self.cprofile.dump_stats(data_filename)
+
+stage_profiler = StageProfiler()
+
+def _count_samples(value):
+    if isinstance(value, (list, SandSieveDataset)):
+        return len(value)
+    if isinstance(value, tuple):
+        for _item in value:
+            if isinstance(_item, (list, SandSieveDataset)):
+                return len(_item)
+    return None
+
+def _path_size(data_path):
+    #size of a file, or of every file matched by a directory or wildcard pattern
+    if os.path.isfile(data_path):
+        return os.path.getsize(data_path)
+    return sum(os.path.getsize(_path) for _path in find_sieve_data_files(data_path))
+
+def profiled_stage(stage, read_argument=None, write_argument=None, samples_argument=None):
+    #records a call in stage_profiler when profiling is on, otherwise calls straight through
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not stage_profiler.enabled:
+                return function(*args, **kwargs)
+            _arguments = inspect.signature(function).bind(*args, **kwargs)
+            _arguments.apply_defaults()
+            _arguments = _arguments.arguments
+            _bytes_read = _path_size(_arguments[read_argument]) if read_argument is not None else 0
+            if stage_profiler._peak_stack:
+                stage_profiler._peak_stack[-1] = max(stage_profiler._peak_stack[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            stage_profiler._peak_stack.append(0)
+            _start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                _seconds = time.perf_counter() - _start
+                _peak = max(stage_profiler._peak_stack.pop(), tracemalloc.get_traced_memory()[1])
+                if stage_profiler._peak_stack:
+                    stage_profiler._peak_stack[-1] = max(stage_profiler._peak_stack[-1], _peak)
+            stage_profiler.records.append({'stage': stage, 'level': len(stage_profiler._peak_stack), 'seconds': _seconds,
+                                           'samples': _count_samples(_arguments[samples_argument] if samples_argument is not None else result),
+                                           'bytes_read': _bytes_read,
+                                           'bytes_written': os.path.getsize(_arguments[write_argument]) if write_argument is not None and os.path.isfile(_arguments[write_argument]) else 0,
+                                           'peak_memory_bytes': _peak})
+            return result
+        return wrapper
+    return decorator
+
+#SAND_ANALYSIS_PROFILE=1 turns profiling on at import, a .json path also writes the records there on exit
+if os.environ.get('SAND_ANALYSIS_PROFILE'):
+    stage_profiler.enable()
+    if os.environ['SAND_ANALYSIS_PROFILE'].endswith('.json'):
+        atexit.register(stage_profiler.export_json, os.environ['SAND_ANALYSIS_PROFILE'])
 
 
 class SandSieveClass():
@@ -45,9 +177,8 @@ class SandSieveClass():
         self.largest_particle_thru_pore = largest_particle_thru_pore
 
     def calculate_sieve_parameters(self):
-        _percentages = [5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 95]
         self.depth = self.depth
-        grain_size_percent = np.interp(_percentages, self.cumulative_wt_perc, self.sieve_sizes)
+        grain_size_percent = np.interp(sieve_percentages, self.cumulative_wt_perc, self.sieve_sizes)
         self.d5 = grain_size_percent[0]
         self.d10 = grain_size_percent[1]
         self.d40 = grain_size_percent[4]
@@ -69,21 +200,138 @@ class SandSieveClass():
         self.constien_criteria = self.d50 / self.uniformity_coeff / proppant_pack_pore_size
 
     def convert_sieve_sizes(self, sieve_unit):      #convert all to microns
-        if sieve_unit == 'micron':
-            self.sieve_sizes = [1 * _sizes for _sizes in self.sieve_sizes]
-        elif sieve_unit == 'mm':
-            self.sieve_sizes = [1000 * _sizes for _sizes in self.sieve_sizes]
-        elif sieve_unit == 'in':
-            self.sieve_sizes = [25.4 * _sizes for _sizes in self.sieve_sizes]
-        elif sieve_unit == 'phi':
-            self.sieve_sizes = [1000 * 2 ** -(_sizes) for _sizes in self.sieve_sizes]
-        elif sieve_unit == 'mesh':
-            self.sieve_sizes = [1 * _sizes for _sizes in self.sieve_sizes]
+        self.sieve_sizes = convert_sieve_sizes(self.sieve_sizes, sieve_unit)
 
     def print_sieve_results(self):
         print(self.name,"\t",self.depth,"\t",[f"{_x:.2f}" for _x in self.retained],"\t",[f"{_y:.2f}" for _y in self.cumulative_wt_perc])
         print(f"{self.name}\t{self.depth}\td10={self.d10:.2f}\td50={self.d50:.2f}\tUniformity={self.uniformity_coeff:.2f}\tSorting={self.sorting_factor:.2f}")
 
+#derived parameters stored as one column each in SandSieveDataset
+sieve_result_fields = ['d5', 'd10', 'd40', 'd50', 'd90', 'd95', 'uniformity_coeff', 'sorting_factor', 'effective_size',
+                       'mobile_fines_coeff', 'mobile_fines_size', 'average_formation_pore', 'smallest_particle_to_bridge',
+                       'largest_particle_thru_pore', 'recommended_gravel_D50', 'recommended_frac_D50', 'constien_criteria']
+
+class SandSieveDataset():
+    #columnar store for samples sharing one sieve ladder, rows are handed out as SandSieveRowView
+    def __init__(self, sieve_sizes, names=(), depths=(), retained=None, dtype=np.float64):
+        self.sieve_sizes = np.asarray(sieve_sizes, dtype=np.float64)
+        self.dtype = np.dtype(dtype)
+        self.name = np.asarray(names, dtype=str)
+        self.depth = np.asarray(depths, dtype=np.float64)
+        if retained is None:
+            retained = np.empty((len(self.name), len(self.sieve_sizes)))
+        self.retained = np.asarray(retained, dtype=self.dtype).reshape(-1, len(self.sieve_sizes))
+        if not len(self.name) == len(self.depth) == len(self.retained):
+            raise ValueError("names, depths and retained weights must have the same number of samples")
+        self.cumulative_wt_perc = None
+        self.results = {_field: np.zeros(len(self.name)) for _field in sieve_result_fields}
+
+    @classmethod
+    def from_sieve_list(cls, sand_sieve_data_list, dtype=np.float64):
+        sieve_sizes = sand_sieve_data_list[0].sieve_sizes
+        for _sample in sand_sieve_data_list:
+            if list(_sample.sieve_sizes) != list(sieve_sizes):
+                raise ValueError(f"Sample {_sample.name} does not use the same sieve sizes as the dataset")
+        dataset = cls(sieve_sizes, [_sample.name for _sample in sand_sieve_data_list], [_sample.depth for _sample in sand_sieve_data_list],
+                      [_sample.retained for _sample in sand_sieve_data_list], dtype)
+        if all(len(_sample.cumulative_wt_perc) for _sample in sand_sieve_data_list):
+            dataset.cumulative_wt_perc = np.asarray([_sample.cumulative_wt_perc for _sample in sand_sieve_data_list], dtype=dataset.dtype)
+        for _field in sieve_result_fields:
+            dataset.results[_field] = np.asarray([getattr(_sample, _field, 0) for _sample in sand_sieve_data_list], dtype=np.float64)
+        return dataset
+
+    def to_sieve_list(self):
+        #independent SandSieveClass copies of every row
+        sieve_list = []
+        for _row in self:
+            sample = SandSieveClass(_row.name, _row.depth, _row.sieve_sizes, _row.retained, _row.cumulative_wt_perc,
+                                    _row.d5, _row.d10, _row.d40, _row.d50, _row.d90, _row.d95, _row.uniformity_coeff, _row.sorting_factor,
+                                    _row.effective_size, _row.mobile_fines_coeff, _row.mobile_fines_size,
+                                    _row.average_formation_pore, _row.smallest_particle_to_bridge, _row.largest_particle_thru_pore)
+            sample.recommended_gravel_D50 = _row.recommended_gravel_D50
+            sample.recommended_frac_D50 = _row.recommended_frac_D50
+            sample.constien_criteria = _row.constien_criteria
+            sieve_list.append(sample)
+        return sieve_list
+
+    def __len__(self):
+        return len(self.name)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [SandSieveRowView(self, _x) for _x in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("dataset index out of range")
+        return SandSieveRowView(self, index)
+
+    def __iter__(self):
+        for _x in range(len(self)):
+            yield SandSieveRowView(self, _x)
+
+    def extend(self, samples):
+        #appends another dataset or a list of SandSieveClass samples on the same sieve ladder
+        if not isinstance(samples, SandSieveDataset):
+            if len(samples) == 0:
+                return
+            samples = SandSieveDataset.from_sieve_list(samples, self.dtype)
+        if not np.array_equal(samples.sieve_sizes, self.sieve_sizes):
+            raise ValueError("Appended samples do not use the same sieve sizes as the dataset")
+        if self.cumulative_wt_perc is not None and samples.cumulative_wt_perc is not None:
+            self.cumulative_wt_perc = np.concatenate([self.cumulative_wt_perc, samples.cumulative_wt_perc.astype(self.dtype)])
+        else:
+            self.cumulative_wt_perc = None
+        self.name = np.concatenate([self.name, samples.name])
+        self.depth = np.concatenate([self.depth, samples.depth])
+        self.retained = np.concatenate([self.retained, samples.retained.astype(self.dtype)])
+        for _field in sieve_result_fields:
+            self.results[_field] = np.concatenate([self.results[_field], samples.results[_field]])
+
+    def convert_sieve_sizes(self, sieve_unit):      #convert the shared ladder to microns
+        self.sieve_sizes = np.asarray(convert_sieve_sizes(self.sieve_sizes.tolist(), sieve_unit), dtype=np.float64)
+
+    def calculate_sieve_results(self, unit, proppant_pack_pore_size):
+        self.convert_sieve_sizes(unit)
+        _results = calculate_sieve_batch(self.sieve_sizes, self.retained, proppant_pack_pore_size)
+        self.cumulative_wt_perc = _results.pop('cumulative_wt_perc').astype(self.dtype)
+        self.results.update(_results)
+
+class SandSieveRowView(SandSieveClass):
+    #one row of a SandSieveDataset, reads and writes go straight to the dataset columns
+    def __init__(self, dataset, index):
+        object.__setattr__(self, '_dataset', dataset)
+        object.__setattr__(self, '_index', index)
+
+    def __getattr__(self, attribute):
+        _dataset = object.__getattribute__(self, '_dataset')
+        _index = object.__getattribute__(self, '_index')
+        if attribute in ('name', 'depth'):
+            return getattr(_dataset, attribute)[_index]
+        elif attribute == 'sieve_sizes':
+            return _dataset.sieve_sizes.tolist()
+        elif attribute == 'retained':
+            return _dataset.retained[_index].tolist()
+        elif attribute == 'cumulative_wt_perc':
+            return [] if _dataset.cumulative_wt_perc is None else _dataset.cumulative_wt_perc[_index].tolist()
+        elif attribute in _dataset.results:
+            return _dataset.results[attribute][_index]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{attribute}'")
+
+    def __setattr__(self, attribute, value):
+        if attribute in ('name', 'depth', 'retained'):
+            getattr(self._dataset, attribute)[self._index] = value
+        elif attribute == 'sieve_sizes':
+            raise AttributeError("sieve sizes are shared by the dataset, use SandSieveDataset.convert_sieve_sizes")
+        elif attribute == 'cumulative_wt_perc':
+            if self._dataset.cumulative_wt_perc is None:
+                self._dataset.cumulative_wt_perc = np.zeros(self._dataset.retained.shape, dtype=self._dataset.dtype)
+            self._dataset.cumulative_wt_perc[self._index] = value
+        elif attribute in self._dataset.results:
+            self._dataset.results[attribute][self._index] = value
+        else:
+            object.__setattr__(self, attribute, value)
+
 class ScreenDataClass():
     def __init__(self, name, type, aperture):
         self.name = name
@@ -104,8 +352,22 @@ class ProppantDataClass():
         self.smallest_particle_to_bridge = self.proppant_pack_pore_size / 3
         self.largest_particle_thru_pore = self.proppant_pack_pore_size / 7
 
+def convert_sieve_sizes(sieve_sizes, sieve_unit):      #convert all to microns
+    if sieve_unit == 'micron':
+        return [1 * _sizes for _sizes in sieve_sizes]
+    elif sieve_unit == 'mm':
+        return [1000 * _sizes for _sizes in sieve_sizes]
+    elif sieve_unit == 'in':
+        return [25.4 * _sizes for _sizes in sieve_sizes]
+    elif sieve_unit == 'phi':
+        return [1000 * 2 ** -(_sizes) for _sizes in sieve_sizes]
+    elif sieve_unit == 'mesh':
+        return [1 * _sizes for _sizes in sieve_sizes]
+    return sieve_sizes
+
+@profiled_stage('read_sieve_data_file', read_argument='data_filename')
 def read_sieve_data_file(data_filename):
-    data_ndarray = np.genfromtxt(data_filename, delimiter=',', dtype=None, names=True, autostrip=False, deletechars="~!@#$%^&*()-=+~|]}[{';: ?>,<")  
+    data_ndarray = np.atleast_1d(np.genfromtxt(data_filename, delimiter=',', dtype=None, names=True, autostrip=False, deletechars="~!@#$%^&*()-=+~|]}[{';: ?>,<"))
     data_class, _x, = [], []
     for data_content in data_ndarray:
         _x = data_content.tolist()
@@ -113,31 +375,302 @@ def read_sieve_data_file(data_filename):
                                         0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0))
     return data_class
 
-def read_saved_file_json(data_filename):
+@profiled_stage('read_sieve_dataset', read_argument='data_filename')
+def read_sieve_dataset(data_filename, dtype=np.float64):
+    #same parsing as read_sieve_data_file, kept as columns instead of one object per sample
+    data_ndarray = np.atleast_1d(np.genfromtxt(data_filename, delimiter=',', dtype=None, names=True, autostrip=False, deletechars="~!@#$%^&*()-=+~|]}[{';: ?>,<"))
+    _fields = data_ndarray.dtype.names
+    _retained = np.empty((len(data_ndarray), len(_fields) - 2), dtype=dtype)
+    for _y, _field in enumerate(_fields[2:]):
+        _retained[:, _y] = data_ndarray[_field]
+    return SandSieveDataset([float(_y) for _y in _fields[2:]], data_ndarray[_fields[0]].astype(str), data_ndarray[_fields[1]], _retained, dtype)
+
+def read_sieve_data_chunks(data_filename, chunk_size=10000, dtype=np.float64):
+    #generator of SandSieveDataset chunks of at most chunk_size samples, only one chunk of lines is held at a time
+    with open(data_filename, 'r') as file:
+        _header = file.readline().rstrip('\r\n').split(',')
+        sieve_sizes = [float(_y) for _y in _header[2:]]
+        _lines = (_line for _line in file if _line.strip() and not _line.lstrip().startswith('#'))
+        while True:
+            _chunk = list(itertools.islice(_lines, chunk_size))
+            if not _chunk:
+                break
+            _rows = [_line.split(',', 1)[1] for _line in _chunk]
+            try:
+                _values = np.loadtxt(_rows, delimiter=',', dtype=np.float64, ndmin=2)
+            except ValueError:
+                #blank cells, read as nan the same way read_sieve_data_file does
+                _values = np.atleast_2d(np.genfromtxt(_rows, delimiter=',', dtype=np.float64))
+            if _values.shape[1] != len(sieve_sizes) + 1:
+                raise ValueError(f"{data_filename}: expected depth and {len(sieve_sizes)} retained weights per sample")
+            yield SandSieveDataset(sieve_sizes, [_line.split(',', 1)[0] for _line in _chunk], _values[:, 0], _values[:, 1:], dtype)
+
+def calculate_sieve_results_chunks(unit, data_filename, data_dictionary, selected_proppant, chunk_size=10000, dtype=np.float64):
+    #streams a sieve file through the calculations one chunk at a time
+    for _chunk in read_sieve_data_chunks(data_filename, chunk_size, dtype):
+        yield calculate_sieve_results(unit, _chunk, data_dictionary, selected_proppant)
+
+#saved JSON sample keys, in SandSieveClass argument order
+json_sample_fields = [('Name', 'name'), ('Depth', 'depth'), ('Sieve Sizes', 'sieve_sizes'), ('Retained Weight', 'retained'),
+                      ('Cumulative Weight Percentage', 'cumulative_wt_perc'), ('d5', 'd5'), ('d10', 'd10'), ('d40', 'd40'), ('d50', 'd50'),
+                      ('d90', 'd90'), ('d95', 'd95'), ('UC', 'uniformity_coeff'), ('Sorting', 'sorting_factor'), ('Effective Size', 'effective_size'),
+                      ('Mobile Fines Coefficient', 'mobile_fines_coeff'), ('Mobile Fines Size', 'mobile_fines_size'),
+                      ('Average Formation Pore Size', 'average_formation_pore'), ('Smallest Particle to Bridge', 'smallest_particle_to_bridge'),
+                      ('Largest Particle to Pass Through', 'largest_particle_thru_pore')]
+
+class _JsonFileStream():
+    #reads a JSON file a chunk at a time, decoding one value at a time from the front of the buffer
+    def __init__(self, file, chunk_size=1 << 20):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.end_of_file = False
+        self.decoder = json.JSONDecoder()
+
+    def _read_more(self):
+        _chunk = self.file.read(self.chunk_size)
+        self.end_of_file = _chunk == ''
+        self.buffer = self.buffer[self.position:] + _chunk
+        self.position = 0
+        return not self.end_of_file
+
+    def next_character(self):
+        #first character that is not whitespace, without consuming it
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\n\r':
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._read_more():
+                raise ValueError("Unexpected end of JSON file")
+
+    def expect(self, characters):
+        _character = self.next_character()
+        if _character not in characters:
+            raise ValueError(f"Expected one of {characters!r} in JSON file, found {_character!r}")
+        self.position += 1
+        return _character
+
+    def decode(self):
+        self.next_character()
+        while True:
+            try:
+                value, _end = self.decoder.raw_decode(self.buffer, self.position)
+                #a number at the end of the buffer may continue in the next chunk
+                if _end < len(self.buffer) or self.end_of_file:
+                    self.position = _end
+                    return value
+            except json.JSONDecodeError:
+                if self.end_of_file:
+                    raise
+            self._read_more()
+
+def _iter_saved_file_json(data_filename):
+    #yields ('Setting', key, value) for top level entries and ('Sample', key, value) for each entry of 'SRT Results', in file order
     with open(data_filename, 'r',) as file:
-        filedata = json.load(file)
-    datalist = []
-    for key in filedata['SRT Results']:
-        datalist.append(SandSieveClass(filedata['SRT Results'][key]['Name'], filedata['SRT Results'][key]['Depth'], filedata['SRT Results'][key]['Sieve Sizes'], 
-                                       filedata['SRT Results'][key]['Retained Weight'], filedata['SRT Results'][key]['Cumulative Weight Percentage'],
-                                       filedata['SRT Results'][key]['d5'], filedata['SRT Results'][key]['d10'], filedata['SRT Results'][key]['d40'], 
-                                       filedata['SRT Results'][key]['d50'], filedata['SRT Results'][key]['d90'], filedata['SRT Results'][key]['d95'],
-                                       filedata['SRT Results'][key]['UC'], filedata['SRT Results'][key]['Sorting'], filedata['SRT Results'][key]['Effective Size'], 
-                                       filedata['SRT Results'][key]['Mobile Fines Coefficient'], filedata['SRT Results'][key]['Mobile Fines Size'], 
-                                       filedata['SRT Results'][key]['Average Formation Pore Size'], filedata['SRT Results'][key]['Smallest Particle to Bridge'], 
-                                       filedata['SRT Results'][key]['Largest Particle to Pass Through']))
-    unit = filedata['Sieve Units']
-    selected_screens = filedata['Selected Screen']
-    selected_proppants = filedata['Selected Proppant']
+        stream = _JsonFileStream(file)
+        stream.expect('{')
+        if stream.next_character() == '}':
+            return
+        while True:
+            _key = stream.decode()
+            stream.expect(':')
+            if _key == 'SRT Results':
+                stream.expect('{')
+                if stream.next_character() == '}':
+                    stream.position += 1
+                else:
+                    while True:
+                        _sample_key = stream.decode()
+                        stream.expect(':')
+                        yield 'Sample', _sample_key, stream.decode()
+                        if stream.expect(',}') == '}':
+                            break
+            else:
+                yield 'Setting', _key, stream.decode()
+            if stream.expect(',}') == '}':
+                return
+
+def _sample_from_json(sample_data):
+    return SandSieveClass(*[sample_data[_key] for _key, _attribute in json_sample_fields])
+
+@profiled_stage('read_saved_file_json', read_argument='data_filename')
+def read_saved_file_json(data_filename):
+    #samples are parsed one at a time as the file is read, the whole file is never held as one dictionary
+    settings, datalist = {}, []
+    for _kind, _key, _value in _iter_saved_file_json(data_filename):
+        if _kind == 'Sample':
+            datalist.append(_sample_from_json(_value))
+        else:
+            settings[_key] = _value
+    unit = settings['Sieve Units']
+    selected_screens = settings['Selected Screen']
+    selected_proppants = settings['Selected Proppant']
     return unit, datalist, selected_screens, selected_proppants
 
-def read_saved_file_sql():  #to do
-    return
+def read_saved_file_json_settings(data_filename):
+    #units and selections only, stops reading once they are found (they are written before the samples)
+    settings = {}
+    for _kind, _key, _value in _iter_saved_file_json(data_filename):
+        if _kind == 'Setting':
+            settings[_key] = _value
+        if all(_setting in settings for _setting in ('Sieve Units', 'Selected Screen', 'Selected Proppant')):
+            break
+    return settings['Sieve Units'], settings['Selected Screen'], settings['Selected Proppant']
+
+def iter_saved_file_json(data_filename, batch_size=10000):
+    #lists of at most batch_size SandSieveClass samples, read lazily from a saved JSON file
+    batch = []
+    for _kind, _key, _value in _iter_saved_file_json(data_filename):
+        if _kind == 'Sample':
+            batch.append(_sample_from_json(_value))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+@profiled_stage('read_saved_file_binary', read_argument='data_filename')
+def read_saved_file_binary(data_filename):
+    #columns are memory-mapped copy-on-write, nothing is read from disk until a value is used
+    with open(data_filename, 'rb') as file:
+        if file.read(len(binary_file_signature)) != binary_file_signature:
+            raise ValueError(f"{data_filename} is not a binary sand sieve results file")
+        _header_length = int.from_bytes(file.read(8), 'little')
+        header = json.loads(file.read(_header_length).decode('utf-8'))
+    columns = {}
+    for _key, _column in header['Columns'].items():
+        if math.prod(_column['shape']) == 0:
+            columns[_key] = np.empty(_column['shape'], dtype=_column['dtype'])
+        else:
+            columns[_key] = np.memmap(data_filename, dtype=_column['dtype'], mode='c', offset=_column['offset'], shape=tuple(_column['shape']))
+    dataset = SandSieveDataset(header['Sieve Sizes'], columns['name'], columns['depth'], columns['retained'], columns['retained'].dtype)
+    dataset.cumulative_wt_perc = columns.get('cumulative_wt_perc')
+    for _field in sieve_result_fields:
+        dataset.results[_field] = columns[_field]
+    return header['Sieve Units'], dataset, header['Selected Screen'], header['Selected Proppant']
+
+def connect_sieve_database(data_filename, create=True):
+    #opens (creating if needed) a SQLite project file in WAL mode so reads are not blocked while a batch is appended
+    if not create and not os.path.isfile(data_filename):
+        raise FileNotFoundError(data_filename)
+    connection = sqlite3.connect(data_filename)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(f"""
+        CREATE TABLE IF NOT EXISTS project (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS sieve_ladders (ladder_id INTEGER PRIMARY KEY, sieve_sizes TEXT UNIQUE);
+        CREATE TABLE IF NOT EXISTS samples (sample_id INTEGER PRIMARY KEY, well TEXT, name TEXT, depth REAL,
+                                            ladder_id INTEGER REFERENCES sieve_ladders (ladder_id), retained BLOB, cumulative_wt_perc BLOB,
+                                            {', '.join(_field + ' REAL' for _field in sieve_result_fields)});
+        CREATE INDEX IF NOT EXISTS samples_well_name ON samples (well, name);
+        CREATE INDEX IF NOT EXISTS samples_depth ON samples (depth);
+        CREATE TABLE IF NOT EXISTS screens (name TEXT PRIMARY KEY, type TEXT, aperture REAL);
+        CREATE TABLE IF NOT EXISTS proppants (name TEXT PRIMARY KEY, permeability REAL, abs_density REAL, abs_volume REAL, bulk_density REAL, D50 REAL);
+        """)
+    return connection
+
+@profiled_stage('read_saved_file_sql', read_argument='data_filename')
+def read_saved_file_sql(data_filename, well=None, top=None, bottom=None, parameter_ranges=None):
+    #loads only the samples matching the filters, parameter_ranges is {result field: (minimum, maximum)}
+    _conditions, _parameters = [], []
+    if well is not None:
+        _conditions.append("samples.well = ?")
+        _parameters.append(well)
+    if top is not None:
+        _conditions.append("samples.depth >= ?")
+        _parameters.append(top)
+    if bottom is not None:
+        _conditions.append("samples.depth <= ?")
+        _parameters.append(bottom)
+    for _field, (_minimum, _maximum) in (parameter_ranges or {}).items():
+        if _field not in sieve_result_fields:
+            raise ValueError(f"Unknown result field {_field}")
+        _conditions.append(f"samples.{_field} BETWEEN ? AND ?")
+        _parameters.extend([_minimum, _maximum])
+    connection = connect_sieve_database(data_filename, create=False)
+    try:
+        project = {_key: json.loads(_value) for _key, _value in connection.execute("SELECT key, value FROM project")}
+        _ladders = {_ladder_id: json.loads(_sieve_sizes) for _ladder_id, _sieve_sizes in connection.execute("SELECT ladder_id, sieve_sizes FROM sieve_ladders")}
+        _rows = connection.execute(f"SELECT name, depth, ladder_id, retained, cumulative_wt_perc, {', '.join(sieve_result_fields)} FROM samples"
+                                   + (" WHERE " + " AND ".join(_conditions) if _conditions else "") + " ORDER BY sample_id", _parameters)
+        datalist = []
+        for _row in _rows:
+            _results = dict(zip(sieve_result_fields, _row[5:]))
+            if _row[4] is not None:
+                #sqlite stores nan as NULL, every result of a calculated sample was written so NULL can only be nan
+                _results = {_field: np.nan if _value is None else _value for _field, _value in _results.items()}
+            sample = SandSieveClass(_row[0], _row[1], list(_ladders[_row[2]]), np.frombuffer(_row[3], dtype=np.float64).tolist(),
+                                    [] if _row[4] is None else np.frombuffer(_row[4], dtype=np.float64).tolist(),
+                                    *[0 if _results[_field] is None else _results[_field] for _field in sieve_result_fields[:14]])
+            for _field in sieve_result_fields[14:]:
+                if _results[_field] is not None:
+                    setattr(sample, _field, _results[_field])
+            datalist.append(sample)
+    finally:
+        connection.close()
+    return project.get('Sieve Units', 'micron'), datalist, project.get('Selected Screen', []), project.get('Selected Proppant', [])
+
+def read_screen_data_sql(data_filename):
+    connection = connect_sieve_database(data_filename, create=False)
+    try:
+        return {_row[0]: ScreenDataClass(*_row) for _row in connection.execute("SELECT name, type, aperture FROM screens ORDER BY rowid")}
+    finally:
+        connection.close()
+
+def read_proppant_data_sql(data_filename):
+    connection = connect_sieve_database(data_filename, create=False)
+    try:
+        data_dictionary = {}
+        for _row in connection.execute("SELECT name, permeability, abs_density, abs_volume, bulk_density, D50 FROM proppants ORDER BY rowid"):
+            data_dictionary[_row[0]] = ProppantDataClass(*_row)
+            data_dictionary[_row[0]].calculate_proppant_parameters()
+        return data_dictionary
+    finally:
+        connection.close()
 
 def append_sieve_data(data, data_filename):
     new_data = read_sieve_data_file(data_filename)
     data.extend(new_data)
 
+def find_sieve_data_files(data_path):
+    #a directory (every file in it) or a glob pattern, sorted so batches are always read in the same order
+    if os.path.isdir(data_path):
+        return sorted(_path for _path in glob.glob(os.path.join(data_path, '*')) if os.path.isfile(_path))
+    return sorted(glob.glob(data_path))
+
+def _read_sieve_data_file_worker(data_filename, unit, data_dictionary, selected_proppant):
+    data = read_sieve_data_file(data_filename)
+    if selected_proppant is not None:
+        data = calculate_sieve_results(unit, data, data_dictionary, selected_proppant)
+    return data
+
+@profiled_stage('read_sieve_data_files', read_argument='data_path')
+def read_sieve_data_files(data_path, unit='micron', data_dictionary=None, selected_proppant=None, max_workers=None):
+    #reads (and calculates when a proppant is given) many sieve files across a process pool
+    #returns the samples of all files in file order and a dictionary of error messages for files that failed
+    data_filenames = find_sieve_data_files(data_path)
+    if selected_proppant is not None:
+        data_dictionary = {selected_proppant: data_dictionary[selected_proppant]}     #only send the proppant in use to the workers
+    data, errors = [], {}
+    if max_workers == 1 or len(data_filenames) <= 1:
+        for _filename in data_filenames:
+            try:
+                data.extend(_read_sieve_data_file_worker(_filename, unit, data_dictionary, selected_proppant))
+            except Exception as _error:
+                errors[_filename] = f"{type(_error).__name__}: {_error}"
+        return data, errors
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        _futures = [executor.submit(_read_sieve_data_file_worker, _filename, unit, data_dictionary, selected_proppant)
+                    for _filename in data_filenames]
+        for _filename, _future in zip(data_filenames, _futures):
+            try:
+                data.extend(_future.result())
+            except Exception as _error:
+                errors[_filename] = f"{type(_error).__name__}: {_error}"
+    return data, errors
+
 def read_screen_data_file(data_filename):    
     data_ndarray = np.genfromtxt(data_filename, delimiter=',', dtype='|U40, |U40, float', names=True, autostrip=True)
     data_class, _x, data_dictionary = [], [], {}
@@ -161,16 +694,542 @@ def read_proppant_data_file(data_filename):
         data_dictionary[data_class[_x].name] = data_class[_x] 
     return data_dictionary
 
-def calculate_sieve_results(unit, data_class, data_dictionary, selected_proppant):
+class SieveResultCache():
+    #calculated results keyed by a hash of the sample's retained weights, sieve sizes in microns and proppant, least recently used dropped first
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def sample_key(sample, unit, selected_proppant, proppant_pack_pore_size):
+        _hash = hashlib.blake2b(digest_size=16)
+        _hash.update(np.asarray(sample.retained, dtype=np.float64).tobytes())
+        #the same key before and after calculate_sieve_results converts the sample's sieve sizes to microns
+        _hash.update(np.asarray(convert_sieve_sizes(list(sample.sieve_sizes), unit), dtype=np.float64).tobytes())
+        _hash.update(f"{selected_proppant}|{proppant_pack_pore_size!r}".encode('utf-8'))
+        return _hash.hexdigest()
+
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, result):
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def save(self, data_filename):
+        _entries = {_key: {'Sieve Sizes': _result['sieve_sizes'], 'Cumulative Weight Percentage': _result['cumulative_wt_perc'],
+                           'Results': {_field: float(_result[_field]) for _field in sieve_result_fields}}
+                    for _key, _result in self.entries.items()}
+        with open(data_filename, 'w',) as file:
+            json.dump({'Max Entries': self.max_entries, 'Entries': _entries}, file)
+
+    @classmethod
+    def load(cls, data_filename):
+        with open(data_filename, 'r',) as file:
+            filedata = json.load(file)
+        cache = cls(filedata['Max Entries'])
+        for _key, _entry in filedata['Entries'].items():
+            _result = {'sieve_sizes': _entry['Sieve Sizes'], 'cumulative_wt_perc': _entry['Cumulative Weight Percentage']}
+            _result.update(_entry['Results'])
+            cache.put(_key, _result)
+        return cache
+
+def sieve_cache_filename(data_filename):
+    #the cache is kept next to the saved project file
+    return os.path.splitext(data_filename)[0] + '.cache.json'
+
+def cumulative_retained_sum(retained):
+    #running sum along each row of a (samples x sieves) array, added in the same order as sum(retained[:_y+1])
+    retained = np.asarray(retained, dtype=float)
+    if sys.version_info < (3, 12):
+        return np.cumsum(retained, axis=1)
+    #python 3.12+ sum() of floats is Neumaier compensated, so repeat it column by column
+    running_sum = np.zeros(retained.shape[0])
+    compensation = np.zeros(retained.shape[0])
+    cumulative = np.empty(retained.shape)
+    with np.errstate(invalid='ignore'):
+        for _y in range(retained.shape[1]):
+            _t = running_sum + retained[:, _y]
+            compensation += np.where(np.abs(running_sum) >= np.abs(retained[:, _y]),
+                                     (running_sum - _t) + retained[:, _y], (retained[:, _y] - _t) + running_sum)
+            running_sum = _t
+            cumulative[:, _y] = np.where((compensation != 0) & np.isfinite(compensation), running_sum + compensation, running_sum)
+    return cumulative
+
+def interpolate_grain_sizes(percentages, cumulative_wt_perc, sieve_sizes):
+    #np.interp(percentages, cumulative_wt_perc[row], sieve_sizes) for every row at once, same arithmetic as np.interp
+    cumulative_wt_perc = np.atleast_2d(np.asarray(cumulative_wt_perc, dtype=float))
+    sieve_sizes = np.asarray(sieve_sizes, dtype=float)
+    _rows = np.arange(cumulative_wt_perc.shape[0])
+    _last = cumulative_wt_perc.shape[1] - 1
+    grain_sizes = np.empty((cumulative_wt_perc.shape[0], len(percentages)))
+    for _k, _percent in enumerate(percentages):
+        _j = np.count_nonzero(cumulative_wt_perc <= _percent, axis=1) - 1      #last point at or below the percentage
+        _jc = np.clip(_j, 0, max(_last - 1, 0))
+        _x0, _x1 = cumulative_wt_perc[_rows, _jc], cumulative_wt_perc[_rows, np.minimum(_jc + 1, _last)]
+        _y0, _y1 = sieve_sizes[_jc], sieve_sizes[np.minimum(_jc + 1, _last)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _slope = (_y1 - _y0) / (_x1 - _x0)
+            _value = _slope * (_percent - _x0) + _y0
+            _value = np.where(np.isnan(_value), _slope * (_percent - _x1) + _y1, _value)
+        _value = np.where(np.isnan(_value) & (_y0 == _y1), _y0, _value)
+        _value = np.where(_x0 == _percent, _y0, _value)
+        _value = np.where(_j >= _last, sieve_sizes[-1], _value)
+        grain_sizes[:, _k] = np.where(_j < 0, sieve_sizes[0], _value)
+    #np.interp gives nan for a curve with nan in it (a blank cell, or an all zero sample), not the end sizes
+    grain_sizes[np.isnan(cumulative_wt_perc).any(axis=1)] = np.nan
+    return grain_sizes
+
+def calculate_sieve_batch(sieve_sizes, retained, proppant_pack_pore_size):
+    #all samples sharing one sieve ladder (in microns) as a (samples x sieves) array, returns a column per SandSieveClass attribute
+    _cumulative = cumulative_retained_sum(retained)
+    results = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results['cumulative_wt_perc'] = 100 * _cumulative / _cumulative[:, -1:]
+    grain_size_percent = interpolate_grain_sizes(sieve_percentages, results['cumulative_wt_perc'], sieve_sizes)
+    results['d5'] = grain_size_percent[:, 0]
+    results['d10'] = grain_size_percent[:, 1]
+    results['d40'] = grain_size_percent[:, 4]
+    results['d50'] = grain_size_percent[:, 5]
+    results['d90'] = grain_size_percent[:, 9]
+    results['d95'] = grain_size_percent[:, 10]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        results['uniformity_coeff'] = results['d40'] / results['d90']
+        results['sorting_factor'] = results['d10'] / results['d95']
+        results['effective_size'] = results['d50'] / results['uniformity_coeff']
+        results['mobile_fines_coeff'] = results['d50'] / results['d95']
+        results['mobile_fines_size'] = results['d50'] / 10
+        results['average_formation_pore'] = results['d50'] / 6.5
+        results['smallest_particle_to_bridge'] = results['average_formation_pore'] / 3
+        results['largest_particle_thru_pore'] = results['average_formation_pore'] / 7
+        results['recommended_gravel_D50'] = results['d50'] * 6
+        results['recommended_frac_D50'] = results['d50'] * 8
+        results['constien_criteria'] = results['d50'] / results['uniformity_coeff'] / proppant_pack_pore_size
+    return results
+
+@profiled_stage('calculate_sieve_results', samples_argument='data_class')
+def calculate_sieve_results(unit, data_class, data_dictionary, selected_proppant, cache=None):
+    proppant_pack_pore_size = data_dictionary[selected_proppant].proppant_pack_pore_size
+    if isinstance(data_class, SandSieveDataset):
+        data_class.calculate_sieve_results(unit, proppant_pack_pore_size)
+        return data_class
+    #samples found in the cache are filled in directly, the rest are calculated together in one batch per sieve ladder
+    sieve_groups, _keys = {}, {}
     for _x in range(len(data_class)):
-        data_class[_x].cumulative_wt_perc = []
-        data_class[_x].convert_sieve_sizes(unit)
-        for _y in range(len(data_class[_x].retained)):
-            data_class[_x].cumulative_wt_perc.append(100 * sum(data_class[_x].retained[:_y+1]) / sum(data_class[_x].retained))     #y+1 is needed y is the length of the range, and we need 1 after the length for slicer
-        data_class[_x].calculate_sieve_parameters()
-        data_class[_x].calculate_constien_criteria(data_dictionary[selected_proppant].proppant_pack_pore_size)
+        #calculated samples already hold their sieve sizes in microns, converting them again would scale them twice
+        _unit = 'micron' if len(data_class[_x].cumulative_wt_perc) > 0 else unit
+        if cache is not None:
+            _keys[_x] = cache.sample_key(data_class[_x], _unit, selected_proppant, proppant_pack_pore_size)
+            _cached = cache.get(_keys[_x])
+            if _cached is not None:
+                data_class[_x].sieve_sizes = list(_cached['sieve_sizes'])
+                data_class[_x].cumulative_wt_perc = list(_cached['cumulative_wt_perc'])
+                for _field in sieve_result_fields:
+                    setattr(data_class[_x], _field, _cached[_field])
+                continue
+        sieve_groups.setdefault((tuple(data_class[_x].sieve_sizes), _unit), []).append(_x)
+    for (_sieve_sizes, _unit), _index in sieve_groups.items():
+        _converted_sizes = convert_sieve_sizes(list(_sieve_sizes), _unit)
+        _results = calculate_sieve_batch(_converted_sizes, [data_class[_x].retained for _x in _index], proppant_pack_pore_size)
+        _cumulative = _results.pop('cumulative_wt_perc').tolist()
+        for _row, _x in enumerate(_index):
+            data_class[_x].sieve_sizes = list(_converted_sizes)
+            data_class[_x].cumulative_wt_perc = _cumulative[_row]
+            for _key in _results:
+                setattr(data_class[_x], _key, _results[_key][_row])
+            if cache is not None:
+                _cached = {_key: _results[_key][_row] for _key in _results}
+                _cached['sieve_sizes'] = list(_converted_sizes)
+                _cached['cumulative_wt_perc'] = list(_cumulative[_row])
+                cache.put(_keys[_x], _cached)
     return data_class
 
+def cumulative_curve_groups(data):
+    #{sieve ladder: (positions in data, cumulative_wt_perc matrix)} of calculated samples, one group for a SandSieveDataset
+    if isinstance(data, SandSieveDataset):
+        if data.cumulative_wt_perc is None:
+            raise ValueError("Sieve results must be calculated first")
+        return {tuple(data.sieve_sizes.tolist()): (np.arange(len(data)), np.asarray(data.cumulative_wt_perc, dtype=np.float64))}
+    _index = {}
+    for _x in range(len(data)):
+        if len(data[_x].cumulative_wt_perc) == 0:
+            raise ValueError(f"Sieve results must be calculated first, {data[_x].name} is not")
+        _index.setdefault(tuple(data[_x].sieve_sizes), []).append(_x)
+    return {_sizes: (np.array(_rows), np.array([data[_x].cumulative_wt_perc for _x in _rows], dtype=np.float64)) for _sizes, _rows in _index.items()}
+
+class SieveDistributionCurves():
+    #cumulative curves of calculated samples, made monotone once and grouped by sieve ladder, for percentile queries of any percentages
+    def __init__(self, data):
+        _groups = cumulative_curve_groups(data)
+        self.samples = len(data)
+        self.groups = []
+        for _sizes, (_rows, _cumulative) in _groups.items():
+            #running maximum guards against negative retained weights breaking the search
+            self.groups.append((_rows, np.asarray(_sizes, dtype=np.float64), np.log(np.asarray(_sizes, dtype=np.float64)), np.maximum.accumulate(_cumulative, axis=1)))
+
+    def percentiles(self, percentages, log_space=True):
+        #(samples x percentages) grain sizes, interpolated in log size by default; log_space=False matches the d-values of calculate_sieve_results
+        percentages = np.atleast_1d(np.asarray(percentages, dtype=np.float64))
+        if np.any((percentages < 0) | (percentages > 100)):
+            raise ValueError("Percentages must be between 0 and 100")
+        grain_sizes = np.full((self.samples, len(percentages)), np.nan)
+        for _rows, _sizes, _log_sizes, _cumulative in self.groups:
+            if log_space:
+                grain_sizes[_rows] = np.exp(interpolate_grain_sizes(percentages, _cumulative, _log_sizes))
+            else:
+                grain_sizes[_rows] = interpolate_grain_sizes(percentages, _cumulative, _sizes)
+        return grain_sizes
+
+    def percentile_columns(self, percentages, log_space=True):
+        #{'d16': column, 'd84': column, ...}
+        grain_sizes = self.percentiles(percentages, log_space)
+        return {f"d{_percent:g}": grain_sizes[:, _k] for _k, _percent in enumerate(np.atleast_1d(percentages))}
+
+    def folk_ward_sorting(self):
+        #inclusive graphic standard deviation in phi units, (phi84 - phi16)/4 + (phi95 - phi5)/6.6
+        _phi5, _phi16, _phi84, _phi95 = (-np.log2(self.percentiles([5, 16, 84, 95]) / 1000)).T
+        return (_phi84 - _phi16) / 4 + (_phi95 - _phi5) / 6.6
+
+def resample_cumulative_curves(cumulative_wt_perc, sieve_sizes, target_sizes):
+    #cumulative curves moved onto another sieve ladder by linear interpolation in log size, held level past the ends of their own ladder
+    cumulative_wt_perc = np.atleast_2d(np.asarray(cumulative_wt_perc, dtype=np.float64))
+    _log_sizes = np.log(np.asarray(sieve_sizes, dtype=np.float64))
+    _target = np.log(np.asarray(target_sizes, dtype=np.float64))
+    if np.array_equal(_log_sizes, _target):
+        return cumulative_wt_perc.copy()
+    if len(_log_sizes) == 1:
+        return np.repeat(cumulative_wt_perc, len(_target), axis=1)
+    _order = np.argsort(_log_sizes, kind='stable')
+    _log_sizes, cumulative_wt_perc = _log_sizes[_order], cumulative_wt_perc[:, _order]
+    _left = np.clip(np.searchsorted(_log_sizes, _target, side='right') - 1, 0, len(_log_sizes) - 2)
+    _step = _log_sizes[_left + 1] - _log_sizes[_left]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        _weight = np.where(_step > 0, np.clip((_target - _log_sizes[_left]) / _step, 0, 1), 0)
+    return cumulative_wt_perc[:, _left] * (1 - _weight) + cumulative_wt_perc[:, _left + 1] * _weight
+
+class SieveSimilarityIndex():
+    #cumulative curves of calculated samples on one shared sieve ladder, nearest neighbour queries scan them a block at a time
+    distances = ('l2', 'ks')
+
+    def __init__(self, data, sieve_sizes=None, dtype=np.float64, block_size=8192, max_block_elements=1 << 21):
+        _groups = cumulative_curve_groups(data)
+        if sieve_sizes is None:
+            #every sieve size used by any sample, coarsest first
+            sieve_sizes = sorted({_size for _sizes in _groups for _size in _sizes}, reverse=True)
+        self.data = data
+        self.sieve_sizes = np.asarray(sieve_sizes, dtype=np.float64)
+        #stored samples per block, and the (queries x stored samples) distances worked on at once
+        self.block_size = block_size
+        self.max_block_elements = max_block_elements
+        self.curves = np.empty((len(data), len(self.sieve_sizes)), dtype=dtype)
+        for _sizes, (_rows, _cumulative) in _groups.items():
+            self.curves[_rows] = resample_cumulative_curves(_cumulative, _sizes, self.sieve_sizes)
+        #squared lengths for the l2 distance as a matrix product
+        self.squared_norms = np.einsum('ij,ij->i', self.curves, self.curves)
+        #the sieves where the curves differ most, the largest gap on these alone is a lower bound of the ks distance
+        self.ks_probe_sieves = np.sort(np.argsort(-np.nanstd(self.curves, axis=0) if len(self) else np.zeros(len(self.sieve_sizes)), kind='stable')[:8])
+
+    def __len__(self):
+        return len(self.curves)
+
+    def query_curves(self, samples):
+        #curves of one calculated sample, a list of them or a SandSieveDataset on the shared ladder
+        if isinstance(samples, SandSieveClass):
+            samples = [samples]
+        curves = np.empty((len(samples), len(self.sieve_sizes)), dtype=self.curves.dtype)
+        for _sizes, (_rows, _cumulative) in cumulative_curve_groups(samples).items():
+            curves[_rows] = resample_cumulative_curves(_cumulative, _sizes, self.sieve_sizes)
+        return curves
+
+    def _block_scores(self, curves, start, end, distance, sieves=None):
+        #values that rank stored samples start:end like their distance to each query, nan where a curve is nan
+        _block = self.curves[start:end]
+        if distance == 'l2':
+            #squared l2 distance less the query's own squared length, which is the same for every stored sample
+            scores = (-2 * curves) @ _block.T
+            scores += self.squared_norms[None, start:end]
+            return scores
+        if distance == 'ks':
+            #one sieve at a time, so only (queries x block) arrays are ever allocated, np.maximum carries nan through
+            _block = np.ascontiguousarray(_block.T)
+            scores = np.zeros((len(curves), end - start), dtype=np.result_type(curves, _block))
+            _gap = np.empty_like(scores)
+            for _y in range(len(self.sieve_sizes)) if sieves is None else sieves:
+                np.subtract(curves[:, _y, None], _block[None, _y], out=_gap)
+                np.maximum(scores, np.abs(_gap, out=_gap), out=scores)
+            return scores
+        raise ValueError(f"Unknown distance {distance}, use one of {', '.join(self.distances)}")
+
+    def block_distances(self, curves, start, end, distance='l2'):
+        #(queries x stored samples start:end) distances, l2 on the cumulative curves or ks for the largest gap between them
+        distances = self._block_scores(curves, start, end, distance)
+        if distance == 'l2':
+            distances += np.einsum('ij,ij->i', curves, curves)[:, None]
+            distances = np.sqrt(np.maximum(distances, 0, out=distances), out=distances)
+        return distances
+
+    def query(self, samples, k=5, distance='l2'):
+        #(queries x k) distances and positions in data of the k most similar stored samples, closest first
+        if distance not in self.distances:
+            raise ValueError(f"Unknown distance {distance}, use one of {', '.join(self.distances)}")
+        curves = self.query_curves(samples)
+        k = min(k, len(self))
+        distances = np.empty((len(curves), k))
+        indices = np.empty((len(curves), k), dtype=np.int64)
+        #queries are split so each (queries x block) score array stays within max_block_elements
+        _block_size = max(1, min(self.block_size, len(self)))
+        _query_chunk = max(1, self.max_block_elements // _block_size)
+        for _q in range(0, len(curves), _query_chunk):
+            _curves = curves[_q:_q + _query_chunk]
+            best_score = np.empty((len(_curves), 0))
+            best_index = np.empty((len(_curves), 0), dtype=np.int64)
+            for _start in range(0, len(self), _block_size):
+                _end = min(_start + _block_size, len(self))
+                if best_score.shape[1] >= k and distance == 'ks':
+                    #screen the block on a few sieves, then measure the full gap only for the samples that could still be among the k best
+                    _worst = np.where(np.isnan(best_score), np.inf, best_score).max(axis=1)
+                    _rows, _columns = np.nonzero(self._block_scores(_curves, _start, _end, distance, self.ks_probe_sieves) < _worst[:, None])
+                    _scores = np.full((len(_curves), _end - _start), np.nan)
+                    _scores[_rows, _columns] = np.abs(_curves[_rows] - self.curves[_start + _columns]).max(axis=1)
+                else:
+                    _scores = self._block_scores(_curves, _start, _end, distance)
+                if best_score.shape[1] < k:
+                    #filling the first k of each query
+                    best_score = np.concatenate([best_score, _scores], axis=1)
+                    best_index = np.concatenate([best_index, np.broadcast_to(np.arange(_start, _end), _scores.shape)], axis=1)
+                    if best_score.shape[1] > k:
+                        _keep = np.argpartition(best_score, k - 1, axis=1)[:, :k]
+                        best_score, best_index = np.take_along_axis(best_score, _keep, axis=1), np.take_along_axis(best_index, _keep, axis=1)
+                    continue
+                #only scores beating a query's current k-th best are merged, usually very few once the first blocks are in
+                _worst = np.where(np.isnan(best_score), np.inf, best_score).max(axis=1)
+                _rows, _columns = np.nonzero(_scores < _worst[:, None])
+                if len(_rows) == 0:
+                    continue
+                _all_rows = np.concatenate([np.repeat(np.arange(len(_curves)), k), _rows])
+                _all_scores = np.concatenate([best_score.ravel(), _scores[_rows, _columns]])
+                _all_index = np.concatenate([best_index.ravel(), _columns + _start])
+                _order = np.lexsort((_all_scores, _all_rows))
+                _sorted_rows = _all_rows[_order]
+                _keep = _order[np.arange(len(_order)) - np.searchsorted(_sorted_rows, _sorted_rows) < k]
+                best_score, best_index = _all_scores[_keep].reshape(-1, k), _all_index[_keep].reshape(-1, k)
+            distances[_q:_q + _query_chunk], indices[_q:_q + _query_chunk] = best_score, best_index
+        if distance == 'l2':
+            #scores are not distances, and the matrix product loses precision for near identical curves, so recompute the k kept exactly
+            distances = np.sqrt(((curves[:, None, :] - self.curves[indices]) ** 2).sum(axis=2))
+        distances[np.isnan(distances)] = np.inf
+        _order = np.lexsort((indices, distances), axis=1)
+        return np.take_along_axis(distances, _order, axis=1), np.take_along_axis(indices, _order, axis=1)
+
+    def nearest_samples(self, samples, k=5, distance='l2'):
+        #for each query sample a list of (stored sample, distance), closest first
+        distances, indices = self.query(samples, k, distance)
+        return [[(self.data[_x], _d) for _x, _d in zip(_row_index, _row_distance)]
+                for _row_index, _row_distance in zip(indices.tolist(), distances.tolist())]
+
+def perturb_retained_weights(retained, draws, rng, noise_model='lognormal', relative_error=0.02, absolute_error=0.0):
+    #(samples x draws x sieves) retained weights with weighing error, relative to each weight plus an absolute balance error, never below zero
+    retained = np.asarray(retained, dtype=np.float64)[:, None, :]
+    _shape = (retained.shape[0], draws, retained.shape[2])
+    if callable(noise_model):
+        #called with the weights broadcast to (samples x draws x sieves) and the random generator
+        perturbed = noise_model(np.broadcast_to(retained, _shape), rng)
+    elif noise_model == 'lognormal':
+        perturbed = retained * np.exp(rng.normal(0, relative_error, _shape))
+    elif noise_model == 'normal':
+        perturbed = retained * (1 + rng.normal(0, relative_error, _shape))
+    else:
+        raise ValueError(f"Unknown noise model {noise_model}, use one of {', '.join(uncertainty_noise_models)} or a function")
+    if absolute_error > 0:
+        perturbed = perturbed + rng.normal(0, absolute_error, _shape)
+    return np.maximum(perturbed, 0)
+
+@profiled_stage('calculate_sieve_uncertainty', samples_argument='data_class')
+def calculate_sieve_uncertainty(unit, data_class, data_dictionary, selected_proppant, draws=1000, noise_model='lognormal', relative_error=0.02,
+                                absolute_error=0.0, confidence=0.95, seed=None, max_chunk_bytes=64 << 20):
+    #monte carlo spread of every result field, {field: {'mean', 'std', 'lower', 'upper'}} with a value per sample
+    proppant_pack_pore_size = data_dictionary[selected_proppant].proppant_pack_pore_size
+    rng = np.random.default_rng(seed)
+    _quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+    if isinstance(data_class, SandSieveDataset):
+        sieve_groups = {tuple(data_class.sieve_sizes.tolist()): (np.arange(len(data_class)), np.asarray(data_class.retained, dtype=np.float64))}
+    else:
+        _index = {}
+        for _x in range(len(data_class)):
+            _index.setdefault(tuple(data_class[_x].sieve_sizes), []).append(_x)
+        sieve_groups = {_sizes: (np.array(_rows), np.array([data_class[_x].retained for _x in _rows], dtype=np.float64)) for _sizes, _rows in _index.items()}
+    results = {_field: {_statistic: np.full(len(data_class), np.nan) for _statistic in ('mean', 'std', 'lower', 'upper')} for _field in sieve_result_fields}
+    for _sieve_sizes, (_rows, _retained) in sieve_groups.items():
+        _converted_sizes = convert_sieve_sizes(list(_sieve_sizes), unit)
+        #samples per block so every field's (samples x draws) values fit the budget, then draws per chunk so the
+        #(samples x draws x sieves) weights and the working arrays of the batch calculation fit it too
+        _block = max(1, max_chunk_bytes // (8 * draws * len(sieve_result_fields)))
+        for _start in range(0, len(_rows), _block):
+            _block_retained = _retained[_start:_start + _block]
+            _samples = len(_block_retained)
+            _draw_chunk = max(1, max_chunk_bytes // (8 * 4 * _samples * len(_sieve_sizes)))
+            _values = {_field: np.empty((_samples, draws)) for _field in sieve_result_fields}
+            for _draw in range(0, draws, _draw_chunk):
+                _count = min(_draw_chunk, draws - _draw)
+                _perturbed = perturb_retained_weights(_block_retained, _count, rng, noise_model, relative_error, absolute_error)
+                _results = calculate_sieve_batch(_converted_sizes, _perturbed.reshape(-1, len(_sieve_sizes)), proppant_pack_pore_size)
+                for _field in sieve_result_fields:
+                    _values[_field][:, _draw:_draw + _count] = _results[_field].reshape(_samples, _count)
+            _index = _rows[_start:_start + _block]
+            for _field in sieve_result_fields:
+                results[_field]['mean'][_index] = _values[_field].mean(axis=1)
+                results[_field]['std'][_index] = _values[_field].std(axis=1)
+                results[_field]['lower'][_index], results[_field]['upper'][_index] = np.quantile(_values[_field], _quantiles, axis=1)
+    return results
+
+def sieve_result_columns(data, fields):
+    #result columns of a SandSieveDataset, or gathered from a list of SandSieveClass samples
+    if isinstance(data, SandSieveDataset):
+        return [np.asarray(data.results[_field] if _field in data.results else getattr(data, _field), dtype=np.float64) for _field in fields]
+    return [np.array([getattr(_sample, _field) for _sample in data], dtype=np.float64) for _field in fields]
+
+class SandDepthIndex():
+    #samples sorted by depth, interval queries are a binary search and zone summaries one pass over the sorted samples
+    def __init__(self, data):
+        self.data = data
+        self.depth, = sieve_result_columns(data, ['depth'])
+        self.order = np.argsort(self.depth, kind='stable')
+        self.sorted_depth = self.depth[self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def interval_bounds(self, tops, bottoms):
+        #start and end positions in depth order of every top <= depth <= bottom interval
+        return (np.searchsorted(self.sorted_depth, np.asarray(tops, dtype=np.float64), side='left'),
+                np.searchsorted(self.sorted_depth, np.asarray(bottoms, dtype=np.float64), side='right'))
+
+    def query(self, top, bottom):
+        #positions in data of the samples between top and bottom, shallowest first
+        _start, _end = self.interval_bounds(top, bottom)
+        return self.order[_start:max(_start, _end)]
+
+    def samples(self, top, bottom):
+        return [self.data[_x] for _x in self.query(top, bottom)]
+
+    def aggregate_zones(self, depth_intervals, method='mean', weights=None, unit='micron', proppant_pack_pore_size=np.nan):
+        #one composite sample per (top, bottom) zone, with the d-values, UC and other parameters recalculated from it
+        #'mean' averages the percentage retained of each sample (optionally weighted, e.g. by the thickness each sample represents),
+        #'composite' adds the raw retained weights as if the samples had been combined before sieving
+        dataset = self.data if isinstance(self.data, SandSieveDataset) else SandSieveDataset.from_sieve_list(self.data)
+        _retained = np.asarray(dataset.retained, dtype=np.float64)[self.order]
+        if method == 'mean':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                _retained = 100 * _retained / _retained.sum(axis=1, keepdims=True)
+        elif method != 'composite':
+            raise ValueError(f"Unknown zone aggregation method {method}")
+        _weights = np.ones(len(self)) if weights is None else np.asarray(weights, dtype=np.float64)[self.order]
+        #samples with blank cells or weights (or all zero under 'mean') are left out, in the prefix sums they would spoil every deeper zone
+        _valid = np.isfinite(_retained).all(axis=1) & np.isfinite(_weights)
+        _retained = np.where(_valid[:, None], _retained, 0)
+        _weights = np.where(_valid, _weights, 0)
+        #prefix sums over the sorted samples give every zone total as a difference of two rows
+        _retained_sum = np.zeros((len(self) + 1, _retained.shape[1]))
+        np.cumsum(_retained * _weights[:, None], axis=0, out=_retained_sum[1:])
+        _weight_sum = np.concatenate([[0], np.cumsum(_weights)])
+        _valid_sum = np.concatenate([[0], np.cumsum(_valid)])
+        _tops = np.array([_interval[0] for _interval in depth_intervals], dtype=np.float64)
+        _bottoms = np.array([_interval[1] for _interval in depth_intervals], dtype=np.float64)
+        _start, _end = self.interval_bounds(_tops, _bottoms)
+        _end = np.maximum(_start, _end)
+        _zone_retained = _retained_sum[_end] - _retained_sum[_start]
+        if method == 'mean':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                _zone_retained = _zone_retained / (_weight_sum[_end] - _weight_sum[_start])[:, None]
+        zones = SandSieveDataset(dataset.sieve_sizes, [f"{_top:g}-{_bottom:g}" for _top, _bottom in zip(_tops, _bottoms)],
+                                 (_tops + _bottoms) / 2, _zone_retained)
+        zones.calculate_sieve_results(unit, proppant_pack_pore_size)
+        #samples used in each zone
+        _counts = _valid_sum[_end] - _valid_sum[_start]
+        for _field in sieve_result_fields:
+            zones.results[_field][_counts == 0] = np.nan
+        return zones, _counts
+
+def interval_minimum_columns(data, depth_intervals, fields):
+    #finest value of each field within each (top, bottom) depth interval, the finest sand controls the design
+    depth_index = SandDepthIndex(data)
+    _columns = sieve_result_columns(data, fields)
+    interval_columns = [np.full(len(depth_intervals), np.nan) for _field in fields]
+    for _x, (_top, _bottom) in enumerate(depth_intervals):
+        _in_interval = depth_index.query(_top, _bottom)
+        if len(_in_interval) > 0:
+            for _column, _interval_column in zip(_columns, interval_columns):
+                _interval_column[_x] = _column[_in_interval].min()
+    return interval_columns
+
+def proppant_design_matrix(d50, uniformity_coeff, proppant_dictionary, proppant_names=None):
+    #samples x proppants matrices, proppants without a D50 in the database are left as nan
+    if proppant_names is None:
+        proppant_names = list(proppant_dictionary)
+    _D50 = np.array([proppant_dictionary[_name].D50 for _name in proppant_names], dtype=np.float64)
+    _pore_size = np.array([proppant_dictionary[_name].proppant_pack_pore_size for _name in proppant_names], dtype=np.float64)
+    _D50[_D50 <= 0] = np.nan
+    _pore_size[_pore_size <= 0] = np.nan
+    d50 = np.asarray(d50, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        design_matrix = {'proppants': proppant_names,
+                         'D50_ratio': _D50[None, :] / d50[:, None],
+                         'constien_criteria': (d50 / np.asarray(uniformity_coeff, dtype=np.float64))[:, None] / _pore_size[None, :]}
+    return design_matrix
+
+def screen_design_matrix(d10, screen_dictionary, screen_names=None):
+    #samples x screens matrix of d10 - aperture, positive where the screen aperture is below the d10
+    if screen_names is None:
+        screen_names = list(screen_dictionary)
+    _aperture = np.array([screen_dictionary[_name].aperture for _name in screen_names], dtype=np.float64)
+    return {'screens': screen_names, 'aperture': _aperture, 'd10_margin': np.asarray(d10, dtype=np.float64)[:, None] - _aperture[None, :]}
+
+def calculate_proppant_design_matrix(data, proppant_dictionary, proppant_names=None):
+    d50, uniformity_coeff = sieve_result_columns(data, ['d50', 'uniformity_coeff'])
+    return proppant_design_matrix(d50, uniformity_coeff, proppant_dictionary, proppant_names)
+
+def calculate_screen_design_matrix(data, screen_dictionary, screen_names=None):
+    d10, = sieve_result_columns(data, ['d10'])
+    return screen_design_matrix(d10, screen_dictionary, screen_names)
+
+def select_proppants(data, proppant_dictionary, target_ratio=6, depth_intervals=None, proppant_names=None):
+    #proppant with the D50/d50 ratio closest to target_ratio for each sample, or each depth interval when given
+    if depth_intervals is None:
+        d50, uniformity_coeff = sieve_result_columns(data, ['d50', 'uniformity_coeff'])
+    else:
+        d50, uniformity_coeff = interval_minimum_columns(data, depth_intervals, ['d50', 'uniformity_coeff'])
+    design_matrix = proppant_design_matrix(d50, uniformity_coeff, proppant_dictionary, proppant_names)
+    _score = np.abs(design_matrix['D50_ratio'] - target_ratio)
+    _score[np.isnan(_score)] = np.inf
+    if _score.shape[1] == 0:
+        return [None] * _score.shape[0]
+    _best = np.argmin(_score, axis=1)
+    return [design_matrix['proppants'][_best[_x]] if np.isfinite(_score[_x, _best[_x]]) else None for _x in range(len(_best))]
+
+def select_screens(data, screen_dictionary, depth_intervals=None, screen_names=None):
+    #largest screen aperture that is still below the d10 for each sample, or each depth interval when given
+    if depth_intervals is None:
+        d10, = sieve_result_columns(data, ['d10'])
+    else:
+        d10, = interval_minimum_columns(data, depth_intervals, ['d10'])
+    design_matrix = screen_design_matrix(d10, screen_dictionary, screen_names)
+    _margin = np.where(design_matrix['d10_margin'] >= 0, design_matrix['d10_margin'], np.inf)
+    if _margin.shape[1] == 0:
+        return [None] * _margin.shape[0]
+    _best = np.argmin(_margin, axis=1)
+    return [design_matrix['screens'][_best[_x]] if np.isfinite(_margin[_x, _best[_x]]) else None for _x in range(len(_best))]
+
 def write_sieve_data_json(unit, datalist, data_filename = 'sanddata.json'):
     datadictionary = {}
     srtdictionary = {}
@@ -183,27 +1242,99 @@ def write_sieve_data_json(unit, datalist, data_filename = 'sanddata.json'):
         json.dump(datadictionary, file)
     return
 
-def write_sieve_data_sql():
-    return
+@profiled_stage('write_sieve_data_sql', write_argument='data_filename', samples_argument='data')
+def write_sieve_data_sql(unit, data, selected_screen_list, selected_proppant_list, data_filename = 'sanddata.db', well=None,
+                         screen_dictionary=None, proppant_dictionary=None, replace=False):
+    #appends the samples in one transaction, replace first removes the well's samples (every sample when well is None)
+    connection = connect_sieve_database(data_filename)
+    try:
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO project (key, value) VALUES (?, ?)",
+                                   [('Sieve Units', json.dumps(unit)), ('Selected Screen', json.dumps(selected_screen_list)),
+                                    ('Selected Proppant', json.dumps(selected_proppant_list))])
+            if screen_dictionary is not None:
+                connection.executemany("INSERT OR REPLACE INTO screens (name, type, aperture) VALUES (?, ?, ?)",
+                                       [(_screen.name, _screen.type, _screen.aperture) for _screen in screen_dictionary.values()])
+            if proppant_dictionary is not None:
+                connection.executemany("INSERT OR REPLACE INTO proppants (name, permeability, abs_density, abs_volume, bulk_density, D50) VALUES (?, ?, ?, ?, ?, ?)",
+                                       [(_proppant.name, _proppant.permeability, _proppant.abs_density, _proppant.abs_volume,
+                                         _proppant.bulk_density, _proppant.D50) for _proppant in proppant_dictionary.values()])
+            if replace and well is None:
+                connection.execute("DELETE FROM samples")
+            elif replace:
+                connection.execute("DELETE FROM samples WHERE well = ?", (well,))
+            _ladder_ids = {}
+            def ladder_id(sieve_sizes):
+                _key = json.dumps([float(_size) for _size in sieve_sizes])
+                if _key not in _ladder_ids:
+                    connection.execute("INSERT OR IGNORE INTO sieve_ladders (sieve_sizes) VALUES (?)", (_key,))
+                    _ladder_ids[_key] = connection.execute("SELECT ladder_id FROM sieve_ladders WHERE sieve_sizes = ?", (_key,)).fetchone()[0]
+                return _ladder_ids[_key]
+            def result_value(value):
+                return None if value is None else float(value)
+            if isinstance(data, SandSieveDataset):
+                _ladder = ladder_id(data.sieve_sizes)
+                _retained = np.asarray(data.retained, dtype=np.float64)
+                _cumulative = None if data.cumulative_wt_perc is None else np.asarray(data.cumulative_wt_perc, dtype=np.float64)
+                _rows = ((well, str(data.name[_x]), float(data.depth[_x]), _ladder, _retained[_x].tobytes(),
+                          None if _cumulative is None else _cumulative[_x].tobytes(),
+                          *[result_value(data.results[_field][_x]) for _field in sieve_result_fields]) for _x in range(len(data)))
+            else:
+                _rows = ((well, _sample.name, float(_sample.depth), ladder_id(_sample.sieve_sizes), np.asarray(_sample.retained, dtype=np.float64).tobytes(),
+                          np.asarray(_sample.cumulative_wt_perc, dtype=np.float64).tobytes() if len(_sample.cumulative_wt_perc) > 0 else None,
+                          *[result_value(getattr(_sample, _field, None)) for _field in sieve_result_fields]) for _sample in data)
+            connection.executemany(f"INSERT INTO samples (well, name, depth, ladder_id, retained, cumulative_wt_perc, {', '.join(sieve_result_fields)}) "
+                                   f"VALUES ({', '.join(['?'] * (6 + len(sieve_result_fields)))})", _rows)
+    finally:
+        connection.close()
 
-def export_sieve_results_file(unit, datalist, selected_screen_list, selected_proppant_list, data_filename = 'sanddataexport.json'):
-    datadictionary = {}
-    srtdictionary = {}
-    datadictionary['Sieve Units'] = unit
-    datadictionary['Selected Screen'] = selected_screen_list
-    datadictionary['Selected Proppant'] = selected_proppant_list
-    for i in range(len(datalist)):
-        srtdictionary["Sample "+str(i)] = {'Name':datalist[i].name, 'Depth':datalist[i].depth, 'Sieve Sizes':datalist[i].sieve_sizes, 
-                                            'Retained Weight':datalist[i].retained, 'Cumulative Weight Percentage':datalist[i].cumulative_wt_perc,
-                                            'd5':datalist[i].d5, 'd10':datalist[i].d10, 'd40':datalist[i].d40, 'd50':datalist[i].d50, 'd90':datalist[i].d90, 'd95':datalist[i].d95,
-                                            'UC':datalist[i].uniformity_coeff, 'Sorting':datalist[i].sorting_factor, 'Effective Size':datalist[i].effective_size,
-                                            'Mobile Fines Coefficient':datalist[i].mobile_fines_coeff, 'Mobile Fines Size':datalist[i].mobile_fines_size,
-                                            'Average Formation Pore Size':datalist[i].average_formation_pore, 'Smallest Particle to Bridge':datalist[i].smallest_particle_to_bridge,
-                                            'Largest Particle to Pass Through':datalist[i].largest_particle_thru_pore,                                          
-                                            }
-    datadictionary['SRT Results'] = srtdictionary
+@profiled_stage('export_sieve_results_file', write_argument='data_filename', samples_argument='datalist')
+def export_sieve_results_file(unit, datalist, selected_screen_list, selected_proppant_list, data_filename = 'sanddataexport.json', batch_size=1000):
+    #written a batch of samples at a time, the output is the same as json.dump of the whole project dictionary
     with open(data_filename, 'w',) as file:
-        json.dump(datadictionary, file)
+        file.write('{' + ', '.join(json.dumps(_key) + ': ' + json.dumps(_value) for _key, _value in
+                                   [('Sieve Units', unit), ('Selected Screen', selected_screen_list), ('Selected Proppant', selected_proppant_list)]))
+        file.write(', "SRT Results": {')
+        for _start in range(0, len(datalist), batch_size):
+            _samples = []
+            for i in range(_start, min(_start + batch_size, len(datalist))):
+                _sample = datalist[i]
+                _samples.append(json.dumps("Sample "+str(i)) + ': ' + json.dumps({_key: getattr(_sample, _attribute) for _key, _attribute in json_sample_fields}))
+            file.write((', ' if _start > 0 else '') + ', '.join(_samples))
+        file.write('}}')
+
+@profiled_stage('export_sieve_results_binary', write_argument='data_filename', samples_argument='data')
+def export_sieve_results_binary(unit, data, selected_screen_list, selected_proppant_list, data_filename = 'sanddataexport.srtbin'):
+    #signature, header length, JSON header (units, selections, sieve sizes, column layout), then one contiguous block per column
+    if not isinstance(data, SandSieveDataset):
+        data = SandSieveDataset.from_sieve_list(data)        #all samples must share one sieve ladder, use JSON otherwise
+    columns = {'name': data.name, 'depth': data.depth, 'retained': data.retained}
+    if data.cumulative_wt_perc is not None:
+        columns['cumulative_wt_perc'] = data.cumulative_wt_perc
+    for _field in sieve_result_fields:
+        columns[_field] = data.results[_field]
+    columns = {_key: np.ascontiguousarray(columns[_key]) for _key in columns}
+    header = {'Sieve Units': unit, 'Selected Screen': selected_screen_list, 'Selected Proppant': selected_proppant_list,
+              'Sieve Sizes': data.sieve_sizes.tolist(), 'Samples': len(data), 'Columns': {}}
+    #offsets depend on the header length, so lay the columns out until the header size stops changing
+    _data_start = 0
+    while True:
+        _offset = _data_start
+        for _key in columns:
+            header['Columns'][_key] = {'dtype': columns[_key].dtype.str, 'shape': list(columns[_key].shape), 'offset': _offset}
+            _offset += -(-columns[_key].nbytes // binary_column_alignment) * binary_column_alignment
+        _header_bytes = json.dumps(header).encode('utf-8')
+        _header_end = len(binary_file_signature) + 8 + len(_header_bytes)
+        if _header_end <= _data_start:
+            break
+        _data_start = -(-_header_end // binary_column_alignment) * binary_column_alignment
+    with open(data_filename, 'wb') as file:
+        file.write(binary_file_signature)
+        file.write(len(_header_bytes).to_bytes(8, 'little'))
+        file.write(_header_bytes)
+        for _key in columns:
+            file.write(b'\0' * (header['Columns'][_key]['offset'] - file.tell()))
+            file.write(columns[_key].tobytes())
 
 def print_sieve_data(sand_sieve_data_list):
     print(f"Name\tDepth\t{sand_sieve_data_list[0].sieve_sizes}")
@@ -218,57 +1349,94 @@ def print_sieve_analysis(sand_sieve_data_list):
                 [f"{_cumwtperc:.2f}" for _cumwtperc in sand_sieve_data_list[_x].cumulative_wt_perc],"\t",
                 f"{sand_sieve_data_list[_x].d50:.2f}\t{sand_sieve_data_list[_x].uniformity_coeff:.2f}")
 
-def show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants):
-    #plots
-    fig, ax1 = plt.subplots(2,4)
+def print_sieve_uncertainty(sand_sieve_data_list, uncertainty, fields=('d50', 'uniformity_coeff', 'sorting_factor', 'constien_criteria')):
+    print("Name\tDepth\t" + "\t".join(f"{_field} [lower, upper]" for _field in fields))
+    for _x in range(len(sand_sieve_data_list)):
+        print(f"{sand_sieve_data_list[_x].name}\t{sand_sieve_data_list[_x].depth:.2f}\t" + "\t".join(
+            f"{uncertainty[_field]['mean'][_x]:.2f} [{uncertainty[_field]['lower'][_x]:.2f}, {uncertainty[_field]['upper'][_x]:.2f}]" for _field in fields))
+
+def bin_depth_track(depth, columns, max_points=None):
+    #mean of each column in max_points equal depth bins (empty bins dropped), so dense depth tracks stay light to draw
+    depth = np.asarray(depth, dtype=np.float64)
+    if max_points is None or len(depth) <= max_points:
+        return depth, [np.asarray(_column, dtype=np.float64) for _column in columns]
+    _edges = np.linspace(depth.min(), depth.max(), max_points + 1)
+    _bin = np.clip(np.searchsorted(_edges, depth, side='right') - 1, 0, max_points - 1)
+    _count = np.bincount(_bin, minlength=max_points)
+    _filled = _count > 0
+    return (np.bincount(_bin, weights=depth, minlength=max_points)[_filled] / _count[_filled],
+            [np.bincount(_bin, weights=_column, minlength=max_points)[_filled] / _count[_filled] for _column in columns])
+
+def sieve_curves(srt_results, attribute):
+    #(sieve size, value) points of every sample, in the form LineCollection takes
+    if isinstance(srt_results, SandSieveDataset):
+        _values = srt_results.retained if attribute == 'retained' else srt_results.cumulative_wt_perc
+        if _values is None:
+            return []
+        return np.stack([np.broadcast_to(srt_results.sieve_sizes, _values.shape), _values], axis=-1)
+    return [np.column_stack([_sample.sieve_sizes, getattr(_sample, attribute)]) for _sample in srt_results if len(getattr(_sample, attribute)) > 0]
+
+@profiled_stage('draw_plots', samples_argument='srt_results')
+def draw_plots(fig, srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, max_depth_points=None):
+    #each panel is drawn with one artist for all samples so large data sets stay fast
+    import matplotlib
+    from matplotlib.collections import LineCollection
+    from matplotlib.lines import Line2D
+    ax1 = fig.subplots(2,4)
     fig.suptitle('Grain Size Distribution and Uniformity Coefficients')
-    fig.tight_layout()
     #plt.rcParams['axes.labelsize'] = 8
-    
-    for sample in range(len(srt_results)):
-            ax1[0, 0].plot(srt_results[sample].sieve_sizes, srt_results[sample].retained, label=srt_results[sample].name)
-            #ax1[0, 0].plot(srt_results[sample].sieve_sizes, srt_results[sample].cumulative_wt_perc)
-            ax1[1, 0].plot(srt_results[sample].sieve_sizes, srt_results[sample].cumulative_wt_perc)
-            ax1[0, 1].plot(srt_results[sample].uniformity_coeff, srt_results[sample].depth, marker='o', linestyle='None')
-            ax1[1, 1].plot(srt_results[sample].uniformity_coeff, srt_results[sample].d50,  marker='o', linestyle='None')
-            ax1[0, 3].plot(srt_results[sample].d10, srt_results[sample].depth, marker='o', linestyle='None')
-            ax1[1, 3].plot(6*srt_results[sample].d50, srt_results[sample].depth, marker='o', linestyle='None')
-
-    ax1[0, 2].plot([SandSieveClass.average_formation_pore for SandSieveClass in srt_results], 
-                [SandSieveClass.depth for SandSieveClass in srt_results], label="Average Formation Pore Size")
-    ax1[0, 2].plot([SandSieveClass.mobile_fines_size for SandSieveClass in srt_results], 
-                [SandSieveClass.depth for SandSieveClass in srt_results], label="Mobile Fines Size")
-    ax1[0, 2].plot([SandSieveClass.smallest_particle_to_bridge for SandSieveClass in srt_results], 
-                [SandSieveClass.depth for SandSieveClass in srt_results], label="Smallest Particle to Bridge")
-    ax1[0, 2].plot([SandSieveClass.largest_particle_thru_pore for SandSieveClass in srt_results], 
-                [SandSieveClass.depth for SandSieveClass in srt_results], label="Largest Particle to Pass Thru Avg Pore")
-    ax1[0, 2].plot([SandSieveClass.mobile_fines_coeff for SandSieveClass in srt_results], 
-                [SandSieveClass.depth for SandSieveClass in srt_results], label="Mobile Fines Coeff", marker='o', linestyle='None')
-    
-    #temporary variable to store proppant D50 for plotting
-    _proppantD50 = []
-    for proppant in selected_proppants:
-        _proppantD50.append(proppant_dictionary[proppant].D50)
-    for sample in range(len(srt_results)):
-        ax1[1, 2].plot(selected_proppants, [_x/srt_results[sample].d50 for _x in _proppantD50], marker='o', linestyle='None')  
+
+    _cycle_colors = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+    sample_colors = matplotlib.colors.to_rgba_array([_cycle_colors[_x % len(_cycle_colors)] for _x in range(len(srt_results))])
+    sample_names = srt_results.name if isinstance(srt_results, SandSieveDataset) else [_sample.name for _sample in srt_results]
+    depth, uniformity_coeff, d10, d50 = sieve_result_columns(srt_results, ['depth', 'uniformity_coeff', 'd10', 'd50'])
+    #depth tracks are drawn shallowest to deepest whatever order the samples were loaded in
+    _order = SandDepthIndex(srt_results).order
+    track_depth, (track_uniformity, track_d10, track_d50, track_pore, track_fines_size, track_bridge, track_pass, track_fines_coeff) = bin_depth_track(
+        depth[_order], [_column[_order] for _column in [uniformity_coeff, d10, d50] + sieve_result_columns(srt_results, ['average_formation_pore',
+        'mobile_fines_size', 'smallest_particle_to_bridge', 'largest_particle_thru_pore', 'mobile_fines_coeff'])], max_depth_points)
+    #binned tracks no longer line up with the samples, so they are drawn in a single colour
+    track_colors = sample_colors[_order] if len(track_depth) == len(depth) else None
+
+    ax1[0, 0].set_xscale("log")
+    ax1[0, 0].add_collection(LineCollection(sieve_curves(srt_results, 'retained'), colors=sample_colors))
+    ax1[0, 0].autoscale_view()
+    if 0 < len(srt_results) <= plot_legend_limit:
+        ax1[0, 0].legend(handles=[Line2D([], [], color=_color, label=_name) for _color, _name in zip(sample_colors, sample_names)], loc="best", fontsize=8)
+    ax1[1, 0].set_xscale("log")
+    ax1[1, 0].add_collection(LineCollection(sieve_curves(srt_results, 'cumulative_wt_perc'), colors=sample_colors))
+    ax1[1, 0].autoscale_view()
+    ax1[0, 1].scatter(track_uniformity, track_depth, c=track_colors)
+    ax1[1, 1].scatter(uniformity_coeff, d50, c=sample_colors)
+    ax1[0, 3].scatter(track_d10, track_depth, c=track_colors)
+    ax1[1, 3].scatter(6*track_d50, track_depth, c=track_colors)
+
+    ax1[0, 2].plot(track_pore, track_depth, label="Average Formation Pore Size")
+    ax1[0, 2].plot(track_fines_size, track_depth, label="Mobile Fines Size")
+    ax1[0, 2].plot(track_bridge, track_depth, label="Smallest Particle to Bridge")
+    ax1[0, 2].plot(track_pass, track_depth, label="Largest Particle to Pass Thru Avg Pore")
+    ax1[0, 2].plot(track_fines_coeff, track_depth, label="Mobile Fines Coeff", marker='o', linestyle='None')
+
+    #D50/d50 of every sample across the selected proppants
+    if len(selected_proppants) > 0:
+        ax1[1, 2].scatter(list(selected_proppants) * len(srt_results),
+                          calculate_proppant_design_matrix(srt_results, proppant_dictionary, selected_proppants)['D50_ratio'].ravel(),
+                          c=np.repeat(sample_colors, len(selected_proppants), axis=0) if len(srt_results) > 0 else None)
 
     ax1[0, 0].set_xlabel("Grain Size")
     ax1[0, 0].xaxis.set_inverted(True)
-    ax1[0, 0].set_xscale("log")
     ax1[0, 0].set_ylabel("Weight retained")
     ax1[0, 0].yaxis.tick_right()
     ax1[0, 0].set_yticks(np.arange(0,11,1))
     ax1[0, 0].yaxis.set_label_position("right")
     ax1[0, 0].grid(True)
-    ax1[0, 0].legend(loc="best", fontsize=8)
     for _key in wentworth_sand_classification:
         ax1[0, 0].axvline(x = wentworth_sand_classification[_key], color='gray', linestyle="dashed")
-        ax1[0, 0].annotate(xy = (wentworth_sand_classification[_key], srt_results[1].depth), text=_key, 
+        ax1[0, 0].annotate(xy = (wentworth_sand_classification[_key], 0), xycoords = ('data', 'axes fraction'), text=_key, 
                         horizontalalignment='left', verticalalignment='bottom', fontsize=6, rotation=90)
 
     ax1[1, 0].set_xlabel("Grain Size")
     ax1[1, 0].xaxis.set_inverted(True)
-    ax1[1, 0].set_xscale("log")
     ax1[1, 0].set_ylabel("Cumulative Weight retained")
     ax1[1, 0].yaxis.tick_right()
     ax1[1, 0].set_yticks(np.arange(0,110,10))
@@ -285,7 +1453,7 @@ def show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_scr
     ax1[0, 1].grid(True)
     for _key in uniformity_classification:
         ax1[0, 1].axvline(x = _key, color='gray', linestyle="dashed")
-        ax1[0, 1].annotate(xy = (_key, 100), text = uniformity_classification[_key], 
+        ax1[0, 1].annotate(xy = (_key, 1), xycoords = ('data', 'axes fraction'), text = uniformity_classification[_key], 
                           horizontalalignment = 'right', verticalalignment = 'top', fontsize = 6, rotation = 90)
 
     ax1[1, 1].set_xlabel("Uniformity Coefficient")
@@ -315,7 +1483,7 @@ def show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_scr
     ax1[0, 3].grid(True)
     for _screen in selected_screens:
         ax1[0, 3].axvline(x = screen_dictionary[_screen].aperture, color='red', linestyle="-")
-        ax1[0, 3].annotate(xy = (screen_dictionary[_screen].aperture, srt_results[1].depth), text = screen_dictionary[_screen].name, 
+        ax1[0, 3].annotate(xy = (screen_dictionary[_screen].aperture, 1), xycoords = ('data', 'axes fraction'), text = screen_dictionary[_screen].name, 
                         horizontalalignment = 'right', verticalalignment = 'top', fontsize = 8, rotation = 90)
 
     ax1[1, 3].set_xlabel("6d50 and Gravel D50")
@@ -324,120 +1492,282 @@ def show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_scr
     ax1[1, 3].grid(True)
     for proppant in selected_proppants:
         ax1[1, 3].axvline(x = proppant_dictionary[proppant].D50, color='red', linestyle="-")
-        ax1[1, 3].annotate(xy = (proppant_dictionary[proppant].D50, srt_results[1].depth), text = proppant_dictionary[proppant].name, 
+        ax1[1, 3].annotate(xy = (proppant_dictionary[proppant].D50, 1), xycoords = ('data', 'axes fraction'), text = proppant_dictionary[proppant].name, 
                         horizontalalignment = 'right', verticalalignment = 'top', fontsize = 8, rotation = 90)   
+    #laid out once every label and tick is in place, otherwise the labels overlap the neighbouring panels
+    fig.tight_layout()
 
+def show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, max_depth_points=None):
+    import matplotlib.pyplot as plt     #only loaded when plotting, keeps startup fast for calculations
+    fig = plt.figure()
+    draw_plots(fig, srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, max_depth_points)
     plt.show()
 
+@profiled_stage('save_plots', write_argument='data_filename', samples_argument='srt_results')
+def save_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, data_filename = 'sandplots.png',
+               max_depth_points=None, figure_size=(20, 10), dpi=100):
+    #renders without pyplot so no window or GUI backend is needed, the format (png, svg, pdf) follows the file extension
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figure_size)
+    draw_plots(fig, srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, max_depth_points)
+    fig.savefig(data_filename, dpi=dpi)
 
-#initialize lists
-selected_screens = []
-selected_proppants = []
-srt_results = []
-screen_database_filename = 'default_screendatabase.txt'
-proppant_database_filename = 'default_proppantdatabase.txt'
-screen_dictionary = read_screen_data_file(screen_database_filename)
-proppant_dictionary = read_proppant_data_file(proppant_database_filename)
-sieve_unit = "micron"
-menu_loop = True
-
-while menu_loop != False:
-    print(f"\nCurrent Units are {sieve_unit}")
-    print(f"Current Screens are {selected_screens}")
-    print(f"Current Proppants are {selected_proppants}\n")
-    menu_selection = int(input(f"Please type the number of selection\n"
-                        "1: Open/Append Sand Sieve Data\n"
-                        "2: Open Saved File\n"
-                        "3: Import Screen Database\n"
-                        "4: Import Proppant Database\n"
-                        "5: Clear Sieve Data and Selected Data\n"
-                        "6: Select Screen\n"
-                        "7: Select Proppant\n"
-                        "8: Select Units\n"
-                        "10: Perform Calculations\n"
-                        "11: Print SRT Data\n"
-                        "12: Plot Results\n"
-                        "20: Save File\n"
-                        "0: Quit\n"
-                        "Selection: "))
-
-    if menu_selection == 1:
-        sieve_data_filename = input("Path to Sand Sieve Data: ")
-        try:
-            append_sieve_data(srt_results, sieve_data_filename)
-            #srt_results = read_sieve_data_file(sieve_data_filename)
-        except FileNotFoundError:
-            print("File not found")
-    elif menu_selection == 2: 
-        sieve_data_filename = input("Path to Saved File: ")
-        try:
-            sieve_unit, srt_results, selected_screens, selected_proppants = read_saved_file_json(sieve_data_filename)
-        except FileNotFoundError:
-            print("File not found")
-    elif menu_selection == 3:
-        screen_database_filename = input("Path to Screen Database File: ")
-        try:
-            screen_dictionary = read_screen_data_file(screen_database_filename)
-        except FileNotFoundError:
-            print("File not found")
-    elif menu_selection == 4: 
-        proppant_database_filename = input("Path to Proppant Database File: ")
-        try:
-            proppant_dictionary = read_proppant_data_file(proppant_database_filename)
-        except FileNotFoundError:
-            print("File not found")
-    elif menu_selection == 5: 
-        selected_screens.clear()
-        selected_proppants.clear()
-        srt_results.clear()
-        print("Sieve Data and Selections Cleared")
-    elif menu_selection == 6:
-        print(f"Available Screens: ",[f"{screen_dictionary[_x].name}" for _x in screen_dictionary],"\t")
-        print(f"Screens Selected = {selected_screens}")
-        selected_screens.append(input("Name of selected screen: "))
-    elif menu_selection == 7: 
-        print(f"Available Proppants: ",[f"{proppant_dictionary[_x].name}" for _x in proppant_dictionary],"\t")
-        print(f"Proppants Selected = {selected_proppants}")
-        selected_proppants.append(input("Name of selected proppant: "))
-    elif menu_selection == 8:
-        print("Available units are micron, mm, inch, phi, mesh")
-        sieve_unit = input("Enter Sieve Units: ")
-    elif menu_selection == 10:
-        srt_results = calculate_sieve_results(sieve_unit, srt_results, proppant_dictionary, selected_proppants[0])
-        #only using the first proppant in list to perform Constein factor calculation
-    elif menu_selection == 11:
-        print_sieve_analysis(srt_results)
-    elif menu_selection == 12:
-        show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants)
-    elif menu_selection == 20: 
-        sieve_data_filename = input("Filename to Save To: ")
-        export_sieve_results_file(sieve_unit, srt_results, selected_screens, selected_proppants, sieve_data_filename)
-    elif menu_selection == 0:
-        print("Thank you")
-        menu_loop = False
+def _save_plots_worker(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, data_filename, max_depth_points):
+    save_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, data_filename, max_depth_points)
+    return data_filename
+
+def save_well_plots(well_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, output_directory='.',
+                    file_format='png', max_depth_points=None, max_workers=None):
+    #one figure file per well ({well name: samples}) rendered across a process pool
+    #returns the files written in well order and a dictionary of error messages for wells that failed
+    proppant_dictionary = {_name: proppant_dictionary[_name] for _name in selected_proppants}      #only send what is plotted to the workers
+    screen_dictionary = {_name: screen_dictionary[_name] for _name in selected_screens}
+    _jobs = [(_well, os.path.join(output_directory, re.sub(r'[^\w\-. ]', '_', str(_well)) + '.' + file_format)) for _well in well_results]
+    filenames, errors = [], {}
+    if max_workers == 1 or len(_jobs) <= 1:
+        for _well, _filename in _jobs:
+            try:
+                filenames.append(_save_plots_worker(well_results[_well], proppant_dictionary, screen_dictionary, selected_screens,
+                                                    selected_proppants, _filename, max_depth_points))
+            except Exception as _error:
+                errors[_well] = f"{type(_error).__name__}: {_error}"
+        return filenames, errors
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        _futures = [executor.submit(_save_plots_worker, well_results[_well], proppant_dictionary, screen_dictionary, selected_screens,
+                                    selected_proppants, _filename, max_depth_points) for _well, _filename in _jobs]
+        for (_well, _filename), _future in zip(_jobs, _futures):
+            try:
+                filenames.append(_future.result())
+            except Exception as _error:
+                errors[_well] = f"{type(_error).__name__}: {_error}"
+    return filenames, errors
+
+
+def interactive_menu():
+    #initialize lists
+    selected_screens = []
+    selected_proppants = []
+    srt_results = []
+    screen_database_filename = default_screen_database_filename
+    proppant_database_filename = default_proppant_database_filename
+    screen_dictionary = read_screen_data_file(screen_database_filename)
+    proppant_dictionary = read_proppant_data_file(proppant_database_filename)
+    sieve_unit = "micron"
+    result_cache = SieveResultCache()
+    menu_loop = True
+
+    while menu_loop != False:
+        print(f"\nCurrent Units are {sieve_unit}")
+        print(f"Current Screens are {selected_screens}")
+        print(f"Current Proppants are {selected_proppants}\n")
+        menu_selection = int(input(f"Please type the number of selection\n"
+                            "1: Open/Append Sand Sieve Data\n"
+                            "2: Open Saved File\n"
+                            "3: Import Screen Database\n"
+                            "4: Import Proppant Database\n"
+                            "5: Clear Sieve Data and Selected Data\n"
+                            "6: Select Screen\n"
+                            "7: Select Proppant\n"
+                            "8: Select Units\n"
+                            "10: Perform Calculations\n"
+                            "11: Print SRT Data\n"
+                            "12: Plot Results\n"
+                            "13: Save Plots to File\n"
+                            "14: Summarize Depth Interval\n"
+                            "20: Save File\n"
+                            "0: Quit\n"
+                            "Selection: "))
+
+        if menu_selection == 1:
+            sieve_data_filename = input("Path to Sand Sieve Data: ")
+            if os.path.isfile(sieve_data_filename):
+                append_sieve_data(srt_results, sieve_data_filename)
+                #srt_results = read_sieve_data_file(sieve_data_filename)
+            elif find_sieve_data_files(sieve_data_filename):
+                #a directory or wildcard pattern, read in parallel and calculated later with option 10
+                new_data, read_errors = read_sieve_data_files(sieve_data_filename)
+                srt_results.extend(new_data)
+                for _filename in read_errors:
+                    print(f"Could not read {_filename}: {read_errors[_filename]}")
+            else:
+                print("File not found")
+        elif menu_selection == 2: 
+            sieve_data_filename = input("Path to Saved File: ")
+            try:
+                if sieve_data_filename.endswith('.srtbin'):
+                    sieve_unit, srt_results, selected_screens, selected_proppants = read_saved_file_binary(sieve_data_filename)
+                    srt_results = srt_results.to_sieve_list()
+                elif sieve_data_filename.endswith('.db'):
+                    sieve_unit, srt_results, selected_screens, selected_proppants = read_saved_file_sql(sieve_data_filename)
+                else:
+                    sieve_unit, srt_results, selected_screens, selected_proppants = read_saved_file_json(sieve_data_filename)
+                if os.path.isfile(sieve_cache_filename(sieve_data_filename)):
+                    result_cache = SieveResultCache.load(sieve_cache_filename(sieve_data_filename))
+            except FileNotFoundError:
+                print("File not found")
+        elif menu_selection == 3:
+            screen_database_filename = input("Path to Screen Database File: ")
+            try:
+                if screen_database_filename.endswith('.db'):
+                    screen_dictionary = read_screen_data_sql(screen_database_filename)
+                else:
+                    screen_dictionary = read_screen_data_file(screen_database_filename)
+            except FileNotFoundError:
+                print("File not found")
+        elif menu_selection == 4: 
+            proppant_database_filename = input("Path to Proppant Database File: ")
+            try:
+                if proppant_database_filename.endswith('.db'):
+                    proppant_dictionary = read_proppant_data_sql(proppant_database_filename)
+                else:
+                    proppant_dictionary = read_proppant_data_file(proppant_database_filename)
+            except FileNotFoundError:
+                print("File not found")
+        elif menu_selection == 5: 
+            selected_screens.clear()
+            selected_proppants.clear()
+            srt_results.clear()
+            print("Sieve Data and Selections Cleared")
+        elif menu_selection == 6:
+            print(f"Available Screens: ",[f"{screen_dictionary[_x].name}" for _x in screen_dictionary],"\t")
+            print(f"Screens Selected = {selected_screens}")
+            selected_screens.append(input("Name of selected screen: "))
+        elif menu_selection == 7: 
+            print(f"Available Proppants: ",[f"{proppant_dictionary[_x].name}" for _x in proppant_dictionary],"\t")
+            print(f"Proppants Selected = {selected_proppants}")
+            selected_proppants.append(input("Name of selected proppant: "))
+        elif menu_selection == 8:
+            print("Available units are micron, mm, inch, phi, mesh")
+            sieve_unit = input("Enter Sieve Units: ")
+        elif menu_selection == 10:
+            srt_results = calculate_sieve_results(sieve_unit, srt_results, proppant_dictionary, selected_proppants[0], result_cache)
+            #only using the first proppant in list to perform Constein factor calculation
+        elif menu_selection == 11:
+            print_sieve_analysis(srt_results)
+        elif menu_selection == 12:
+            show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants)
+        elif menu_selection == 13:
+            plot_filename = input("Filename to Save Plots To (.png, .svg, .pdf): ")
+            save_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants, plot_filename)
+        elif menu_selection == 14:
+            #sample sizes are only in microns once the calculations have been performed
+            zone_top = float(input("Top of interval: "))
+            zone_bottom = float(input("Bottom of interval: "))
+            try:
+                zones, zone_counts = SandDepthIndex(srt_results).aggregate_zones([(zone_top, zone_bottom)])
+                print(f"{zone_counts[0]} samples between {zone_top} and {zone_bottom}")
+                if zone_counts[0] > 0:
+                    zones[0].print_sieve_results()
+            except ValueError as _error:
+                print(_error)
+        elif menu_selection == 20: 
+            sieve_data_filename = input("Filename to Save To (.srtbin for binary, .db for SQLite): ")
+            save_cache = input("Also save the calculation cache (y/n): ").strip().lower().startswith('y')
+            if sieve_data_filename.endswith('.db'):
+                write_sieve_data_sql(sieve_unit, srt_results, selected_screens, selected_proppants, sieve_data_filename,
+                                     screen_dictionary=screen_dictionary, proppant_dictionary=proppant_dictionary, replace=True)
+            elif sieve_data_filename.endswith('.srtbin'):
+                try:
+                    export_sieve_results_binary(sieve_unit, srt_results, selected_screens, selected_proppants, sieve_data_filename)
+                except ValueError as _error:
+                    print(_error)
+            else:
+                export_sieve_results_file(sieve_unit, srt_results, selected_screens, selected_proppants, sieve_data_filename)
+            if save_cache:
+                result_cache.save(sieve_cache_filename(sieve_data_filename))
+        elif menu_selection == 0:
+            print("Thank you")
+            menu_loop = False
     
-    #Demo mode for testing
-    elif menu_selection == 100:
-        print("Demo Mode")
-        screen_database_filename = 'default_screendatabase.txt'
-        proppant_database_filename = 'default_proppantdatabase.txt'
-        sieve_data_filename = 'default_sievefile.txt'
-        save_filename = 'default_sanddata.json'
-        sieve_unit = 'micron'
-        
-        #srt_results = read_sieve_data_file(sieve_data_filename)
-        append_sieve_data(srt_results, sieve_data_filename)
-        screen_dictionary = read_screen_data_file(screen_database_filename)
-        proppant_dictionary = read_proppant_data_file(proppant_database_filename)
-        selected_screens.append("6 Gauge WWS")
-        selected_proppants.append("Gravel 20/40")
-        selected_proppants.append("Carbolite 20/40")
-        srt_results = calculate_sieve_results(sieve_unit, srt_results, proppant_dictionary, selected_proppants[0])
-        export_sieve_results_file(sieve_unit, srt_results, selected_screens, selected_proppants, save_filename)
-        sieve_unit, srt_results, selected_screens, selected_proppants  = read_saved_file_json('default_sanddata_new.json')
-        #print_sieve_analysis(srt_results)
-        srt_results[1].print_sieve_results()
-        show_plots(srt_results, proppant_dictionary, screen_dictionary, selected_screens, selected_proppants)
+        else:
+            print("Invalid Selection")
 
-    else:
-        print("Invalid Selection")
+
+def run_batch(args):
+    screen_dictionary = read_screen_data_file(args.screen_database)
+    proppant_dictionary = read_proppant_data_file(args.proppant_database)
+    for _name in args.screen:
+        if _name not in screen_dictionary:
+            raise SystemExit(f"Screen {_name} is not in {args.screen_database}")
+    for _name in args.proppant:
+        if _name not in proppant_dictionary:
+            raise SystemExit(f"Proppant {_name} is not in {args.proppant_database}")
+    srt_results, failed = [], False
+    for _data_path in args.inputs:
+        if not find_sieve_data_files(_data_path):
+            print(f"No sieve data files match {_data_path}", file=sys.stderr)
+            failed = True
+            continue
+        #only the first proppant is used for the Constien criteria, as in the menu
+        _data, _errors = read_sieve_data_files(_data_path, args.unit, proppant_dictionary, args.proppant[0], args.workers)
+        srt_results.extend(_data)
+        for _filename in _errors:
+            print(f"Could not read {_filename}: {_errors[_filename]}", file=sys.stderr)
+            failed = True
+    if args.print_results and len(srt_results) > 0:
+        print_sieve_analysis(srt_results)
+    if args.uncertainty is not None and len(srt_results) > 0:
+        #the results are already calculated, so the sieve sizes are in microns
+        _uncertainty = calculate_sieve_uncertainty('micron', srt_results, proppant_dictionary, args.proppant[0], args.uncertainty, args.noise_model,
+                                                   args.relative_error, args.absolute_error, args.confidence)
+        print_sieve_uncertainty(srt_results, _uncertainty)
+    if args.output is not None:
+        if args.output.endswith('.db'):
+            #appended to the project, so batches can be added to one database over time
+            write_sieve_data_sql(args.unit, srt_results, args.screen, args.proppant, args.output, args.well,
+                                 screen_dictionary=screen_dictionary, proppant_dictionary=proppant_dictionary)
+        elif args.output.endswith('.srtbin'):
+            try:
+                export_sieve_results_binary(args.unit, srt_results, args.screen, args.proppant, args.output)
+            except ValueError as _error:
+                #the binary format needs one sieve ladder for all samples
+                print(f"Could not save {args.output}: {_error}", file=sys.stderr)
+                failed = True
+        else:
+            export_sieve_results_file(args.unit, srt_results, args.screen, args.proppant, args.output)
+    if args.plot is not None:
+        save_plots(srt_results, proppant_dictionary, screen_dictionary, args.screen, args.proppant, args.plot, args.max_depth_points)
+    print(f"{len(srt_results)} samples calculated")
+    return 1 if failed else 0
+
+def main(argv=None):
+    #no arguments opens the interactive menu, otherwise the given sieve files are calculated without prompts
+    parser = argparse.ArgumentParser(description="Sand sieve analysis. Run without arguments for the interactive menu.")
+    parser.add_argument('inputs', nargs='*', help="sieve data files, directories or wildcard patterns")
+    parser.add_argument('--unit', default='micron', choices=['micron', 'mm', 'in', 'phi', 'mesh'], help="sieve size units of the input files")
+    parser.add_argument('--proppant', action='append', default=[], help="proppant name, may be repeated, the first is used for the Constien criteria")
+    parser.add_argument('--screen', action='append', default=[], help="screen name, may be repeated")
+    parser.add_argument('--output', help="results file, .srtbin for the binary format, .db to append to a SQLite project, JSON otherwise")
+    parser.add_argument('--well', help="well name stored with the samples in a SQLite project")
+    parser.add_argument('--plot', help="save the plots to this file (.png, .svg or .pdf) without opening a window")
+    parser.add_argument('--max-depth-points', type=int, default=None, help="average the depth plots into at most this many depth bins")
+    parser.add_argument('--screen-database', default=default_screen_database_filename, help="screen database file")
+    parser.add_argument('--proppant-database', default=default_proppant_database_filename, help="proppant database file")
+    parser.add_argument('--workers', type=int, default=None, help="processes used to read and calculate the files")
+    parser.add_argument('--print-results', action='store_true', help="print the calculated results")
+    parser.add_argument('--uncertainty', type=int, default=None, metavar='DRAWS', help="print confidence intervals from this many perturbed copies of each sample")
+    parser.add_argument('--noise-model', default='lognormal', choices=uncertainty_noise_models, help="weighing error model for --uncertainty")
+    parser.add_argument('--relative-error', type=float, default=0.02, help="standard deviation of the weighing error relative to each weight")
+    parser.add_argument('--absolute-error', type=float, default=0.0, help="standard deviation of an added balance error, in weight units")
+    parser.add_argument('--confidence', type=float, default=0.95, help="confidence level of the --uncertainty intervals")
+    parser.add_argument('--profile', help="write per stage timings, sample counts, bytes and peak memory to this JSON file")
+    parser.add_argument('--cprofile', help="write a cProfile dump of the whole run to this file")
+    args = parser.parse_args(argv)
+    if args.inputs and not args.proppant:
+        parser.error("at least one --proppant is needed to calculate the results")
+    if args.profile is not None or args.cprofile is not None:
+        stage_profiler.enable(cprofile=args.cprofile is not None)
+    try:
+        if not args.inputs:
+            interactive_menu()
+            return 0
+        return run_batch(args)
+    finally:
+        if args.profile is not None:
+            stage_profiler.export_json(args.profile)
+        if args.cprofile is not None:
+            stage_profiler.export_cprofile(args.cprofile)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
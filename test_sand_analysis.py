@@ -0,0 +1,123 @@
+import os
+import numpy as np
+import sand_analysis
+
+proppant_dictionary = sand_analysis.read_proppant_data_file(sand_analysis.default_proppant_database_filename)
+sieve_filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sievefile.txt')
+
+
+def calculate_one_by_one(sample, proppant_pack_pore_size):
+    #the per sample path the batch engine has to reproduce exactly
+    sample.cumulative_wt_perc = [100 * np.float64(sum(sample.retained[:_y + 1])) / np.float64(sum(sample.retained)) for _y in range(len(sample.retained))]
+    sample.calculate_sieve_parameters()
+    sample.calculate_constien_criteria(proppant_pack_pore_size)
+    return sample
+
+def test_batch_matches_per_sample_with_blank_and_zero_rows():
+    batch = sand_analysis.read_sieve_data_file(sieve_filename)
+    single = sand_analysis.read_sieve_data_file(sieve_filename)
+    for data in (batch, single):
+        data[1].retained[5] = np.nan        #blank cell
+        data[2].retained = [0.0] * len(data[2].retained)
+    pore_size = proppant_dictionary['Gravel 20/40'].proppant_pack_pore_size
+    sand_analysis.calculate_sieve_results('micron', batch, proppant_dictionary, 'Gravel 20/40')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        single = [calculate_one_by_one(_sample, pore_size) for _sample in single]
+    for _batch, _single in zip(batch, single):
+        for _field in sand_analysis.sieve_result_fields:
+            np.testing.assert_array_equal(getattr(_batch, _field), getattr(_single, _field), err_msg=f"{_batch.name} {_field}")
+    assert np.isnan(batch[1].d50) and np.isnan(batch[2].d50) and np.isnan(batch[2].uniformity_coeff)
+
+def test_zone_summary_skips_blank_and_zero_samples():
+    data = sand_analysis.calculate_sieve_results('micron', sand_analysis.read_sieve_data_file(sieve_filename), proppant_dictionary, 'Gravel 20/40')
+    zones = [(23030, 23050), (23050, 23100)]
+    expected, expected_counts = sand_analysis.SandDepthIndex(data).aggregate_zones(zones)
+    depth_index = sand_analysis.SandDepthIndex(data)
+    shallowest = data[depth_index.order[0]]
+    for method in ('mean', 'composite'):
+        for retained in ([0.0] * len(shallowest.retained), [np.nan] * len(shallowest.retained)):
+            shallowest.retained = retained
+            summary, counts = sand_analysis.SandDepthIndex(data).aggregate_zones(zones, method)
+            reference, _counts = sand_analysis.SandDepthIndex([_sample for _sample in data if _sample is not shallowest]).aggregate_zones(zones, method)
+            np.testing.assert_array_equal(summary.results['d50'], reference.results['d50'])
+            np.testing.assert_array_equal(counts, expected_counts)
+    assert np.all(np.isfinite(expected.results['d50']))
+
+def test_saved_files_round_trip_nan_samples(tmp_path):
+    data = sand_analysis.read_sieve_data_file(sieve_filename)
+    data[1].retained[5] = np.nan
+    data[2].retained = [0.0] * len(data[2].retained)
+    data = sand_analysis.calculate_sieve_results('micron', data, proppant_dictionary, 'Gravel 20/40')
+    saved = {'json': sand_analysis.read_saved_file_json, 'srtbin': sand_analysis.read_saved_file_binary, 'db': sand_analysis.read_saved_file_sql}
+    for _extension, _read in saved.items():
+        _filename = str(tmp_path / f"project.{_extension}")
+        if _extension == 'json':
+            sand_analysis.export_sieve_results_file('micron', data, ['6 Gauge WWS'], ['Gravel 20/40'], _filename)
+        elif _extension == 'srtbin':
+            sand_analysis.export_sieve_results_binary('micron', data, ['6 Gauge WWS'], ['Gravel 20/40'], _filename)
+        else:
+            sand_analysis.write_sieve_data_sql('micron', data, ['6 Gauge WWS'], ['Gravel 20/40'], _filename)
+        unit, loaded, screens, proppants = _read(_filename)
+        assert (unit, list(screens), list(proppants)) == ('micron', ['6 Gauge WWS'], ['Gravel 20/40'])
+        assert len(loaded) == len(data)
+        for _saved, _loaded in zip(data, loaded):
+            assert _loaded.name == _saved.name and _loaded.depth == _saved.depth
+            np.testing.assert_array_equal(_loaded.retained, _saved.retained)
+            np.testing.assert_array_equal(_loaded.cumulative_wt_perc, _saved.cumulative_wt_perc)
+            #the JSON format has no recommended D50s or Constien criteria
+            for _field in sand_analysis.sieve_result_fields[:14] if _extension == 'json' else sand_analysis.sieve_result_fields:
+                np.testing.assert_array_equal(getattr(_loaded, _field), getattr(_saved, _field), err_msg=f"{_extension} {_saved.name} {_field}")
+
+def test_cache_recalculates_only_changed_samples_in_other_units():
+    cache = sand_analysis.SieveResultCache()
+    data = sand_analysis.read_sieve_data_file(sieve_filename)
+    for _sample in data:
+        _sample.sieve_sizes = [_size / 1000 for _size in _sample.sieve_sizes]
+    sand_analysis.calculate_sieve_results('mm', data, proppant_dictionary, 'Gravel 20/40', cache)
+    first_d50 = [_sample.d50 for _sample in data]
+    data[3].retained = list(data[3].retained)
+    data[3].retained[10] += 1
+    sand_analysis.calculate_sieve_results('mm', data, proppant_dictionary, 'Gravel 20/40', cache)
+    assert len(cache) == len(data) + 1
+    assert [_sample.d50 for _x, _sample in enumerate(data) if _x != 3] == [_d50 for _x, _d50 in enumerate(first_d50) if _x != 3]
+    reference = sand_analysis.read_sieve_data_file(sieve_filename)
+    reference[3].retained[10] += 1
+    sand_analysis.calculate_sieve_results('micron', reference, proppant_dictionary, 'Gravel 20/40')
+    np.testing.assert_allclose([_sample.d50 for _sample in data], [_sample.d50 for _sample in reference])
+
+def test_chunked_reader_accepts_blank_cells(tmp_path):
+    lines = open(sieve_filename).read().splitlines()
+    _cells = lines[2].split(',')
+    _cells[7] = ''
+    lines[2] = ','.join(_cells)
+    data_filename = str(tmp_path / 'blank.txt')
+    with open(data_filename, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+    data = sand_analysis.calculate_sieve_results('micron', sand_analysis.read_sieve_data_file(data_filename), proppant_dictionary, 'Gravel 20/40')
+    chunks = list(sand_analysis.calculate_sieve_results_chunks('micron', data_filename, proppant_dictionary, 'Gravel 20/40', chunk_size=5))
+    assert sum(len(_chunk) for _chunk in chunks) == len(data)
+    samples = [_sample for _chunk in chunks for _sample in _chunk]
+    assert np.isnan(samples[1].retained[5])
+    for _sample, _chunk_sample in zip(data, samples):
+        assert _chunk_sample.name == _sample.name and _chunk_sample.depth == _sample.depth
+        np.testing.assert_array_equal(_chunk_sample.retained, _sample.retained)
+        for _field in sand_analysis.sieve_result_fields:
+            np.testing.assert_array_equal(getattr(_chunk_sample, _field), getattr(_sample, _field), err_msg=f"{_sample.name} {_field}")
+
+def test_similarity_query_matches_brute_force():
+    data = sand_analysis.read_sieve_data_file(sieve_filename)
+    data[4].retained = [0.0] * len(data[4].retained)
+    data = sand_analysis.calculate_sieve_results('micron', data, proppant_dictionary, 'Gravel 20/40')
+    queries = data[::5]
+    for block_size, max_block_elements in ((7, 20), (8192, 1 << 21)):
+        index = sand_analysis.SieveSimilarityIndex(data, block_size=block_size, max_block_elements=max_block_elements)
+        curves = index.query_curves(queries)
+        for distance in index.distances:
+            full = np.stack([index.block_distances(curves[_q:_q + 1], 0, len(index), distance)[0] for _q in range(len(curves))])
+            if distance == 'l2':
+                full = np.sqrt(((curves[:, None, :] - index.curves[None]) ** 2).sum(axis=2))
+            full[np.isnan(full)] = np.inf
+            distances, indices = index.query(queries, k=4, distance=distance)
+            np.testing.assert_allclose(distances, np.sort(full, axis=1)[:, :4])
+            np.testing.assert_allclose(np.take_along_axis(full, indices, axis=1), distances)
+            assert 4 not in indices[[0, 2, 3, 4]]